@@ -1,19 +1,17 @@
 import numpy as np
-import librosa
-import sounddevice as sd
 import queue
 import threading
 import logging
 import time
-import asyncio
-from madmom.features.beats import DBNBeatTrackingProcessor, RNNBeatProcessor
-from madmom.processors import IOProcessor, process_online
+from contextlib import nullcontext
+from .features import SpectralFeatures
+from .capture import AudioCapture
+from .engines import BeatEngine, SpectralFluxBeatEngine
+from .tempo import TempoTracker
+from .vu import VuMeter, VuChannel
+from .event_bridge import EventBridge, KEEP, LATEST
 
-# ✅ Configure logging
-logging.basicConfig(
-    format="%(asctime)s [%(levelname)s] (%(threadName)s) - %(message)s",
-    level=logging.INFO
-)
+LOG_FORMAT = "%(asctime)s [%(levelname)s] (%(threadName)s) - %(message)s"  # Used by the entry points
 
 # Separate loggers for different parts
 log_general = logging.getLogger("BeatDetector")
@@ -22,20 +20,33 @@ log_madmom = logging.getLogger("MadmomProcessor")
 log_classification = logging.getLogger("BeatClassification")
 
 class BeatDetector:
-    def __init__(self, callback=None, vuCallback=None, loop=None):
+    def __init__(self, callback=None, vuCallback=None, loop=None, buffer_duration=3, capture=None, tracer=None,
+                 engine="madmom", madmom_mode="thread", cpu_affinity=None, vu_rate=30.0, vu_attack=0.01,
+                 vu_release=0.25, profiler=None):
         """
         Initializes the Beat Detector with Madmom and Librosa-based processing.
         :param callback: Function to be called when a beat is detected.
+        :param buffer_duration: Length of the analysis ring buffer in seconds.
+        :param capture: Audio source (defaults to the input device, see replay.ReplayCapture for files).
+        :param tracer: Optional tracing.LatencyTracer that receives per-beat stage timestamps.
+        :param engine: "madmom" (RNN + DBN), "flux" (low-CPU NumPy tracker) or a BeatEngine instance.
+        :param madmom_mode: "thread" runs madmom in this interpreter, "process" in a separate worker process.
+        :param cpu_affinity: CPU ids the madmom worker process is pinned to (process mode only).
+        :param vu_rate: Maximum VU updates per second delivered to vuCallback (latest value wins).
+        :param vu_attack: VU smoothing time constant in seconds for rising levels.
+        :param vu_release: VU smoothing time constant in seconds for falling levels.
+        :param profiler: Optional startup.StartupProfiler receiving model load, warm-up and first beat times.
         """
         # Parameters
         self.sampleRate = 44100  # Sampling rate
         self.buffer_size = 2048  # FFT window size
         self.hop_length = 512  # Hop length for STFT
-        self.buffer_duration = 3  # Length of audio buffer in seconds
+        self.buffer_duration = buffer_duration  # Length of audio buffer in seconds
         self.loop = loop
         # Hysteresis thresholds
         self.beat_threshold_high = 4.5  # Switch to beats (based on empirical values)
         self.beat_threshold_low = 3.0   # Switch to melody
+        self.low_band_threshold = None  # Optional minimum kick-band power share (0-1) for switching to beats
 
         # Beat Tracking Configuration
         self.kwargs = dict(
@@ -51,157 +62,297 @@ class BeatDetector:
 
         self.onset_history = []
         self.audio_queue = queue.Queue()
+        self.samples_processed = 0  # Stream position of the classification thread
+        # One STFT per hop feeds onset flux, VU and the classification features (built by prepare())
+        self.features = None
+        self.onset_detector = None
         self.Beatcallback = callback
         self.VuCallback = vuCallback
+        self.vu_meter = VuMeter(self.sampleRate, attack_time=vu_attack, release_time=vu_release)
+        # Beats and VU reach the loop through one batched bridge: beats are never dropped,
+        # VU keeps only the latest value and is dispatched at most vu_rate times per second
+        self.events = None
+        self.vu_channel = None  # Thread-side VU delivery when there is no loop
+        if loop:
+            self.events = EventBridge(loop)
+            if callback:
+                self.events.register("beat", callback, policy=KEEP)
+            if vuCallback:
+                self.events.register("vu", vuCallback, policy=LATEST, rate=vu_rate)
+        elif vuCallback:
+            self.vu_channel = VuChannel(vuCallback, rate=vu_rate)
         self.running = False
         self.classification_state = "beats"
         self.stable_frames = 0
-        self.last_update_time = time.time()
+        self.last_update_time = 0.0  # Stream time of the last classification switch
         self.avgOnset = 0
-        self.vu_level = 0.0
-        # Initialize Madmom processors
-        self.in_processor = RNNBeatProcessor(**self.kwargs)
-        self.beat_processor = DBNBeatTrackingProcessor(**self.kwargs)
-        self.out_processor = [self.beat_processor, self.beat_callback]
-        self.processor = IOProcessor(self.in_processor, self.out_processor)
-
-        # Audio stream setup
-        self.stream = sd.InputStream(callback=self.audio_callback, channels=1, samplerate=self.sampleRate, blocksize=self.buffer_size)
+        # Consumer batching counters
+        self.wakeups = 0
+        self.blocks_processed = 0
+        self.last_blocks_per_wakeup = 0
+        self.max_blocks_per_wakeup = 0
+        # The beat tracking engine (and its models) is built by prepare(), at the latest in run()
+        self.engine = None
+        self.engine_config = (engine, madmom_mode, cpu_affinity)
+        self.profiler = profiler
+        self._prepare_lock = threading.Lock()
+        self._run_time = None
+
+        # One shared capture feeds both the beat engine and the classification queue
+        self.capture = capture or AudioCapture(sample_rate=self.sampleRate, blocksize=self.buffer_size)
+        self.useBeatClassification = True
+        self.capture.subscribe(self.audio_callback)
+
+        # Observers: listener(beats, stream_time) and listener(state, stream_time)
+        self.beat_listeners = []
+        self.classification_listeners = []
+        self.tracer = tracer
+        self.tempo = TempoTracker()
 
         # Threads
-        self.madmomThread = None
         self.beatClassifyThread = None
 
-    def audio_callback(self, indata, frames, time, status):
-        """Receives audio data and places it in the queue for processing."""
-        if status:
-            log_audio.warning(f"Audio stream error: {status}")
-        self.audio_queue.put(indata[:, 0].copy())
-        log_audio.debug("Audio data received and added to queue.")
+    def _stage(self, name):
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+
+    def prepare(self):
+        """Build the feature stage and the beat engine, then run the engine's warm-up inference.
 
-    def beat_callback(self, beats, output=None):
+        Loading librosa's filterbank and the madmom models takes seconds, so callers may run
+        this in a background thread (e.g. while BLE devices connect); run() calls it if that
+        did not happen.
+        """
+        with self._prepare_lock:
+            if self.engine is not None:
+                return self.engine
+            with self._stage("features"):
+                self.features = SpectralFeatures(
+                    sr=self.sampleRate, n_fft=self.buffer_size, hop_length=self.hop_length,
+                    history_frames=1 + int(self.buffer_duration * self.sampleRate) // self.hop_length,
+                    pre_max=10, post_max=10, pre_avg=5, post_avg=5, delta=0.7, wait=10,
+                )
+                self.onset_detector = self.features.onset
+            with self._stage("model load"):
+                engine = self.create_engine(*self.engine_config)
+            with self._stage("warm-up"):
+                engine.warm_up()
+            self.engine = engine
+            return engine
+
+    def create_engine(self, engine, madmom_mode="thread", cpu_affinity=None):
+        """Build the configured beat engine (madmom is only imported when selected)."""
+        if isinstance(engine, BeatEngine):
+            engine.on_beats = self.beat_callback
+            return engine
+        if engine == "flux":
+            return SpectralFluxBeatEngine(self.beat_callback, sample_rate=self.sampleRate, fps=self.kwargs["fps"],
+                                          min_bpm=self.kwargs["min_bpm"], max_bpm=self.kwargs["max_bpm"])
+        if engine != "madmom":
+            raise ValueError(f"Unknown beat engine: {engine}")
+
+        with self._stage("import madmom"):
+            from .madmom_runner import MadmomThreadRunner, MadmomProcessRunner
+        if madmom_mode == "thread":
+            return MadmomThreadRunner(self.kwargs, self.beat_callback, sample_rate=self.sampleRate)
+        if madmom_mode == "process":
+            return MadmomProcessRunner(self.kwargs, self.beat_callback, sample_rate=self.sampleRate,
+                                       cpu_affinity=cpu_affinity)
+        raise ValueError(f"Unknown madmom_mode: {madmom_mode}")
+
+    def audio_callback(self, block, sample_index):
+        """Receives captured audio and places it in the queue for classification."""
+        if self.useBeatClassification:
+            self.audio_queue.put(block.copy())
+            log_audio.debug("Audio data received and added to queue.")
+
+    def beat_callback(self, beats, stream_time=None, frame_time=None, frame_start=None):
         """Callback function when a beat is detected by Madmom."""
         if len(beats) > 0:
+            if self.profiler:
+                self.profiler.mark("first beat", since=self._run_time)
+            if self.tracer:
+                self.tracer.begin(capture=frame_time, madmom=frame_start)
+                self.tracer.mark("detected")
             log_madmom.info(f"Detected Beats: {beats} (Onset Strength: {self.avgOnset:.2f})")
-            if self.classification_state == "beats" and self.Beatcallback:
-                if self.loop:
-                    asyncio.run_coroutine_threadsafe(self.Beatcallback(True), self.loop)  # Send event to asyncio
+            for beat in beats:
+                self.tempo.update(float(beat), stream_time, frame_time)
+            for listener in self.beat_listeners:
+                listener(beats, stream_time)
+            if self.Beatcallback:
+                is_beat = self.classification_state == "beats"
+                if self.events:
+                    self.events.publish("beat", is_beat)  # Send event to asyncio
                 else:
-                    self.Beatcallback(True)
-            elif self.Beatcallback:
-                if self.loop:
-                    asyncio.run_coroutine_threadsafe(self.Beatcallback(False), self.loop)  # Send event to asyncio
-                else:
-                    self.Beatcallback(False)
+                    self.Beatcallback(is_beat)
+            if self.tracer:
+                self.tracer.mark("dispatched")
 
         if not self.running:
             log_madmom.warning("Beat detection stopped unexpectedly.")
             exit()
 
-    def get_vu_level(self,audio_buffer, sr, hop_length):
-        """Compute the current VU level with smoothing and dB conversion."""
-        VU_ATTACK = 1  # Fast increase (0.1 = quick response)
-        VU_RELEASE = 1  # Slow decay (0.05 = smooth fade-out)
-
-        # Compute RMS
-        frame_length = 4 * hop_length  # Adjust dynamically
-        rms = librosa.feature.rms(y=audio_buffer, frame_length=frame_length, hop_length=hop_length)[0]
-        current_rms = rms[-1]  # Latest RMS value
-
-        # Convert to dB (avoid log(0) issues)
-        vu_db = 20 * np.log10(current_rms + 1e-6)  # dB conversion
+    def get_tempo_estimate(self):
+        """Current tempo/phase estimate from the tracked beats (see TempoTracker.estimate)."""
+        return self.tempo.estimate()
+
+    def get_vu_level(self):
+        """Current smoothed VU level in dB."""
+        return self.vu_meter.level
+
+    def has_low_band(self):
+        """True if the kick band carries enough power for beat mode (always true without a threshold)."""
+        if self.low_band_threshold is None:
+            return True
+        ratio = self.features.low_band_ratio()
+        return len(ratio) > 0 and float(ratio.mean()) >= self.low_band_threshold
+
+    def describe_features(self):
+        """Summary of the classification features over the analysis window."""
+        rms = self.features.rms()
+        if len(rms) == 0:
+            return "no audio"
+        return (f"onset {self.avgOnset:.2f}, level {20 * np.log10(float(rms.mean()) + 1e-6):.1f} dB, "
+                f"low band {float(self.features.low_band_ratio().mean()) * 100:.0f}%, "
+                f"centroid {float(self.features.centroid().mean()):.0f} Hz")
+
+    def drain_audio_queue(self, timeout=0.1):
+        """Block until audio is queued, then take every pending block in one pass."""
+        try:
+            blocks = [self.audio_queue.get(timeout=timeout)]
+        except queue.Empty:
+            return None
 
-        # Apply attack/release smoothing
-        if vu_db > self.vu_level:
-            self.vu_level += VU_ATTACK * (vu_db - self.vu_level)  # Attack (fast rise)
-        else:
-            self.vu_level += VU_RELEASE * (vu_db - self.vu_level)  # Release (slow decay)
-
-        return self.vu_level  # Return smoothed VU level in dB
+        while True:
+            try:
+                blocks.append(self.audio_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self.wakeups += 1
+        self.blocks_processed += len(blocks)
+        self.last_blocks_per_wakeup = len(blocks)
+        self.max_blocks_per_wakeup = max(self.max_blocks_per_wakeup, len(blocks))
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+    def get_batch_stats(self):
+        """Return counters describing how many audio blocks were handled per wakeup."""
+        return {
+            "wakeups": self.wakeups,
+            "blocks_processed": self.blocks_processed,
+            "avg_blocks_per_wakeup": self.blocks_processed / self.wakeups if self.wakeups else 0.0,
+            "last_blocks_per_wakeup": self.last_blocks_per_wakeup,
+            "max_blocks_per_wakeup": self.max_blocks_per_wakeup,
+        }
 
     def process_audio(self):
         """Processes the audio data in a separate thread for classification."""
-        audio_buffer = np.zeros(self.buffer_duration * self.sampleRate)
-
-        with self.stream:
-            while self.running:
-                if not self.audio_queue.empty():
-                    new_data = self.audio_queue.get()
-                    audio_buffer = np.roll(audio_buffer, -len(new_data))
-                    audio_buffer[-len(new_data):] = new_data
-
-                    # Compute onset strength
-                    onset_env = librosa.onset.onset_strength(y=audio_buffer, sr=self.sampleRate, hop_length=self.hop_length)
-                    peaks = librosa.util.peak_pick(onset_env, pre_max=10, post_max=10, pre_avg=5, post_avg=5, delta=0.7, wait=10)
-                    current_vu = self.get_vu_level(audio_buffer, self.sampleRate, self.hop_length)
-                    if self.loop:
-                        asyncio.run_coroutine_threadsafe(self.VuCallback(current_vu), self.loop)  # Send event to asyncio
-                    else:
-                        self.VuCallback(current_vu)
-
-                    if len(peaks) > 0:
-                        self.avgOnset = onset_env[peaks].mean()
-                        self.onset_history.append(self.avgOnset)
-
-                        # Keep only the latest 100 values
-                        if len(self.onset_history) > 100:
-                            self.onset_history.pop(0)
-
-                        current_time = time.time()
-
-                        # Beat detection with hysteresis
-                        if self.classification_state == "melody" and self.avgOnset > self.beat_threshold_high:
-                            self.stable_frames += 1
-                            if self.stable_frames > 3 and (current_time - self.last_update_time) > self.buffer_duration:
-                                self.classification_state = "beats"
-                                self.stable_frames = 0
-                                self.last_update_time = current_time
-                                log_classification.info("Switched to BEATS")
-
-                        elif self.classification_state == "beats" and (self.avgOnset < self.beat_threshold_low or len(peaks) < self.buffer_duration * 3):
-                            self.stable_frames += 1
-                            if self.stable_frames > 3 and (current_time - self.last_update_time) > self.buffer_duration:
-                                self.classification_state = "melody"
-                                self.stable_frames = 0
-                                self.last_update_time = current_time
-                                log_classification.info("Switched to MELODY")
-                        else:
-                            self.stable_frames = 0  # Reset stability counter
+        while self.running:
+            new_data = self.drain_audio_queue()
+            if new_data is not None:
+                try:
+                    self.process_chunk(new_data)
+                finally:
+                    for _ in range(self.last_blocks_per_wakeup):
+                        self.audio_queue.task_done()  # audio_queue.join() waits for analysed blocks
+
+    def process_chunk(self, new_data):
+        """Runs onset/VU analysis and beat classification on a chunk of new samples."""
+        self.samples_processed += len(new_data)
+
+        # Transform the new frames only; onset, VU and classification features share the spectrum
+        new_frames = self.features.process(new_data)
+        onset_env = self.onset_detector.envelope
+        peaks = self.onset_detector.peaks
+        if new_frames:
+            level = self.vu_meter.update_rms(float(self.features.rms(1)[0]), new_frames * self.hop_length)
+            if self.vu_channel:
+                self.vu_channel.publish(level)
+            elif self.VuCallback and self.events:
+                self.events.publish("vu", level)
+
+        if len(peaks) > 0:
+            self.avgOnset = onset_env[peaks].mean()
+            self.onset_history.append(self.avgOnset)
+
+            # Keep only the latest 100 values
+            if len(self.onset_history) > 100:
+                self.onset_history.pop(0)
+
+            current_time = self.samples_processed / self.sampleRate  # Stream time keeps replays deterministic
+
+            # Beat detection with hysteresis
+            if self.classification_state == "melody" and self.avgOnset > self.beat_threshold_high and \
+                    self.has_low_band():
+                self.stable_frames += 1
+                if self.stable_frames > 3 and (current_time - self.last_update_time) > self.buffer_duration:
+                    self.classification_state = "beats"
+                    self.stable_frames = 0
+                    self.last_update_time = current_time
+                    log_classification.info(f"Switched to BEATS ({self.describe_features()})")
+                    for listener in self.classification_listeners:
+                        listener("beats", current_time)
+
+            elif self.classification_state == "beats" and (self.avgOnset < self.beat_threshold_low or len(peaks) < self.buffer_duration * 3):
+                self.stable_frames += 1
+                if self.stable_frames > 3 and (current_time - self.last_update_time) > self.buffer_duration:
+                    self.classification_state = "melody"
+                    self.stable_frames = 0
+                    self.last_update_time = current_time
+                    log_classification.info(f"Switched to MELODY ({self.describe_features()})")
+                    for listener in self.classification_listeners:
+                        listener("melody", current_time)
+            else:
+                self.stable_frames = 0  # Reset stability counter
 
     def run(self, useBeatClassification=True):
         """Starts the beat detection process."""
         if not self.running:
             self.running = True
-            self.madmomThread = threading.Thread(target=process_online, args=(self.processor,), kwargs=self.kwargs, daemon=True)
+            self.useBeatClassification = useBeatClassification
             self.beatClassifyThread = threading.Thread(target=self.process_audio, daemon=True)
 
-            self.madmomThread.start()
-            log_general.info("Madmom beat detection thread started.")
+            self.prepare()
+            self._run_time = time.perf_counter()
+            self.engine.start(self.capture)
+
+            if self.events:
+                self.events.start()
+            if self.vu_channel:
+                self.vu_channel.start()
 
             if useBeatClassification:
                 self.beatClassifyThread.start()
                 log_general.info("Beat classification thread started.")
 
+            self.capture.start()
+
     def stop(self):
         """Stops the beat detection process gracefully."""
         self.running = False
         log_general.info("Stopping BeatDetector...")
 
-        if self.madmomThread:
-            self.madmomThread.join()
-            log_general.info("Madmom thread stopped.")
+        self.capture.stop()
+        if self.engine:
+            self.engine.stop(self.capture)
 
         if self.beatClassifyThread:
             self.beatClassifyThread.join()
             log_general.info("Beat classification thread stopped.")
 
+        if self.vu_channel:
+            self.vu_channel.stop()
+        if self.events:
+            self.events.stop()
+
         log_general.info("BeatDetector fully stopped.")
 
 
-# Example usage if run directly
+# Example usage: python -m BeatDetection.BeatDetector (run as a module, the package uses relative imports)
 if __name__ == "__main__":
     import sys
 
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+
     def beat_callback(state):
         log_general.info("🔴 Beat detected!")
 
@@ -0,0 +1,225 @@
+import queue
+import logging
+import threading
+import time
+import numpy as np
+from .ring_buffer import AudioRingBuffer, SharedAudioRing
+
+log_capture = logging.getLogger("AudioCapture")
+
+
+class AudioCapture:
+    """Owns the single input stream and fans every block out to all subscribers.
+
+    Subscribers are called from the audio thread as `consumer(block, sample_index)`, where
+    `sample_index` is the absolute position of the block's first sample since the capture
+    started. All consumers therefore share one timestamp base.
+    """
+
+    def __init__(self, sample_rate=44100, blocksize=2048, channels=1, device=None, channel=0):
+        """
+        :param channels: Channels opened on the device (at least `channel + 1`).
+        :param device: sounddevice device index or name (default: the system input).
+        :param channel: Input channel forwarded to the subscribers, e.g. one room of a multi-channel interface.
+        """
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.channels = max(channels, channel + 1)
+        self.device = device
+        self.channel = channel
+        self.subscribers = []
+        self.samples_captured = 0
+        self.stream = None
+
+    def subscribe(self, consumer):
+        """Register a callable that receives every captured mono block."""
+        self.subscribers.append(consumer)
+
+    def stream_time(self):
+        """Seconds of audio captured so far (the shared time base)."""
+        return self.samples_captured / self.sample_rate
+
+    def audio_callback(self, indata, frames, time, status):
+        """sounddevice callback: forwards the selected channel to all subscribers."""
+        if status:
+            log_capture.warning(f"Audio stream error: {status}")
+        self.push(indata[:, self.channel])
+
+    def push(self, block):
+        """Distribute a block of samples as if it had been captured from the device."""
+        sample_index = self.samples_captured
+        self.samples_captured += len(block)
+        for consumer in self.subscribers:
+            consumer(block, sample_index)
+
+    def start(self):
+        """Open the input device and start capturing."""
+        if self.stream is None:
+            import sounddevice as sd  # Not needed for replayed audio
+            self.stream = sd.InputStream(callback=self.audio_callback, channels=self.channels, device=self.device,
+                                         samplerate=self.sample_rate, blocksize=self.blocksize)
+            self.stream.start()
+            log_capture.info("Audio capture started.")
+
+    def stop(self):
+        """Stop capturing and release the input device."""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            log_capture.info("Audio capture stopped.")
+
+
+class ChannelFanout(AudioCapture):
+    """One input stream on a multi-channel device, with subscribers per channel.
+
+    Used when several consumers (e.g. the zones of a ZoneAnalysisPool) listen to
+    different channels of the same device: the device is opened once and every channel
+    subscriber is called from the audio thread as `consumer(block, sample_index)`.
+    """
+
+    def __init__(self, sample_rate=44100, blocksize=2048, channels=1, device=None):
+        super().__init__(sample_rate, blocksize, channels=channels, device=device)
+        self.channel_subscribers = []  # (channel, consumer)
+
+    def subscribe_channel(self, channel, consumer):
+        """Register a callable that receives every captured block of `channel`."""
+        if channel >= self.channels:
+            raise ValueError(f"Channel {channel} is not opened (device opened with {self.channels} channels).")
+        self.channel_subscribers.append((channel, consumer))
+
+    def audio_callback(self, indata, frames, time, status):
+        if status:
+            log_capture.warning(f"Audio stream error: {status}")
+        sample_index = self.samples_captured
+        for channel, consumer in self.channel_subscribers:
+            consumer(indata[:, channel], sample_index)
+        self.push(indata[:, self.channel])
+
+
+class SharedRingCapture(AudioCapture):
+    """Capture fed from a `SharedAudioRing` that another process writes.
+
+    Reading starts at the ring's current position when the capture is started, so audio
+    written before (e.g. while the consumer was still loading) is skipped rather than
+    reported as an overrun. Samples lost to overruns later are counted in
+    `samples_dropped` and still advance the sample index, keeping the time base aligned
+    with the writer.
+    """
+
+    def __init__(self, ring_name, capacity, data_ready, sample_rate=44100, blocksize=2048):
+        """
+        :param ring_name: Shared memory name of the ring.
+        :param data_ready: multiprocessing Event the writer sets after every write.
+        """
+        super().__init__(sample_rate, blocksize)
+        self.ring_name = ring_name
+        self.capacity = capacity
+        self.data_ready = data_ready
+        self.samples_dropped = 0
+        self.running = False
+        self.thread = None
+
+    def _read(self, ring):
+        position = int(ring.total[0])
+        while self.running:
+            self.data_ready.clear()
+            block, position, dropped = ring.read(position)
+            if dropped:
+                self.samples_dropped += dropped
+                self.samples_captured += dropped
+                log_capture.warning(f"Shared ring overrun, {dropped} samples dropped.")
+            if len(block):
+                self.push(block)
+            else:
+                self.data_ready.wait(0.1)
+        ring.close()
+
+    def start(self):
+        """Attach to the ring and start forwarding new samples."""
+        if self.thread is None:
+            ring = SharedAudioRing(self.capacity, name=self.ring_name, create=False)
+            self.running = True
+            self.thread = threading.Thread(target=self._read, args=(ring,), daemon=True)
+            self.thread.start()
+            log_capture.info("Shared ring capture started.")
+
+    def stop(self):
+        """Stop forwarding and detach from the ring."""
+        if self.thread is not None:
+            self.running = False
+            self.data_ready.set()
+            self.thread.join()
+            self.thread = None
+            log_capture.info("Shared ring capture stopped.")
+
+
+class MadmomFrameSource:
+    """Frame iterator for madmom's online processors, fed from an `AudioCapture`.
+
+    Behaves like `madmom.audio.signal.Stream`: every step advances `hop_size` samples and
+    yields the last `frame_size` samples as a `Signal`, but the audio comes from the shared
+    capture instead of a second device stream. `frame_size` defaults to madmom's FRAME_SIZE.
+    """
+
+    def __init__(self, sample_rate=44100, fps=100, frame_size=2048, timeout=0.1):
+        from madmom.audio.signal import Signal  # Only needed by the madmom engine
+        self.Signal = Signal
+
+        hop_size = sample_rate / float(fps)
+        if int(hop_size) != hop_size:
+            raise ValueError(f"only integer `hop_size` supported, not {hop_size}")
+
+        self.sample_rate = sample_rate
+        self.hop_size = int(hop_size)
+        self.frame_size = int(frame_size)
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.buffer = AudioRingBuffer(self.frame_size)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.frame_idx = 0
+        self.samples_skipped = 0  # Samples of the capture that never reached this source
+        self.frame_time = None  # perf_counter() arrival time of the newest sample in the current frame
+
+    def push(self, block, sample_index=None):
+        """Subscriber entry point for `AudioCapture`."""
+        self.queue.put((np.array(block, dtype=np.float32), time.perf_counter()))
+
+    def skip(self, samples):
+        """Account for `samples` of the capture lost before the next pushed block."""
+        self.queue.put((int(samples), None))
+
+    def stop(self):
+        """End the iteration once the blocks queued so far have been consumed."""
+        self.queue.put(None)
+
+    def stream_time(self):
+        """Capture position in seconds up to the end of the frames returned so far."""
+        return (self.frame_idx * self.hop_size + self.samples_skipped) / self.sample_rate
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while len(self._pending) < self.hop_size:
+            try:
+                block = self.queue.get(timeout=self.timeout)
+            except queue.Empty:
+                continue
+            if block is None:
+                raise StopIteration
+            block, frame_time = block
+            if frame_time is None:  # Samples skipped, see skip()
+                self.samples_skipped += block
+                continue
+            self.frame_time = frame_time
+            self._pending = np.concatenate((self._pending, block))
+
+        self.buffer.write(self._pending[:self.hop_size])
+        self._pending = self._pending[self.hop_size:]
+
+        start = self.stream_time()
+        signal = self.Signal(np.array(self.buffer.latest()), sample_rate=self.sample_rate,
+                        dtype=np.float32, num_channels=1, start=start)
+        self.frame_idx += 1
+        return signal
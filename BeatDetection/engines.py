@@ -0,0 +1,198 @@
+import queue
+import threading
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+import numpy as np
+from .ring_buffer import AudioRingBuffer
+
+log_engine = logging.getLogger("BeatEngine")
+
+
+class BeatEngine(ABC):
+    """Defines a beat tracking back end driven by an `AudioCapture`.
+
+    Engines report beats as `on_beats(beats, stream_time, frame_time, frame_start)` and
+    record the processing time of every analysis frame in `frame_durations`.
+    """
+
+    fps = 100
+
+    @abstractmethod
+    def start(self, capture): pass
+
+    @abstractmethod
+    def stop(self, capture): pass
+
+    def warm_up(self):
+        """Run a throwaway inference before start() so the first real frame is not slowed
+        down by lazy initialisation. Engines without models need nothing."""
+
+    def cpu_stats(self):
+        """Per-frame processing cost; `load` is the fraction of the real-time budget used."""
+        durations = np.fromiter(self.frame_durations, dtype=float)
+        if len(durations) == 0:
+            return {"frames": 0}
+        return {
+            "frames": len(durations),
+            "mean_ms": float(durations.mean() * 1000.0),
+            "p95_ms": float(np.percentile(durations, 95) * 1000.0),
+            "max_ms": float(durations.max() * 1000.0),
+            "load": float(durations.mean() * self.fps),
+        }
+
+
+class SpectralFluxBeatEngine(BeatEngine):
+    """Low-CPU beat tracker using only NumPy.
+
+    Onsets come from log-magnitude spectral flux, the tempo from the autocorrelation of the
+    onset envelope within [min_bpm, max_bpm], and the beat phase from a comb over the last
+    few periods. Beats are emitted at the tracked phase as audio frames arrive.
+    """
+
+    def __init__(self, on_beats, sample_rate=44100, fps=100, frame_size=2048, min_bpm=100, max_bpm=200,
+                 history_seconds=6.0, tempo_interval=0.25, warmup_seconds=2.0, comb_beats=4):
+        """
+        :param on_beats: Callback receiving detected beats (see BeatEngine).
+        :param history_seconds: Length of the onset envelope used for tempo and phase.
+        :param tempo_interval: Seconds between tempo/phase re-estimations.
+        :param warmup_seconds: Envelope length required before beats are emitted.
+        """
+        hop_size = sample_rate / float(fps)
+        if int(hop_size) != hop_size:
+            raise ValueError(f"only integer `hop_size` supported, not {hop_size}")
+
+        self.on_beats = on_beats
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.hop_size = int(hop_size)
+        self.frame_size = frame_size
+        self.min_lag = int(np.floor(60.0 * fps / max_bpm))
+        self.max_lag = int(np.ceil(60.0 * fps / min_bpm))
+        self.tempo_interval = max(1, int(tempo_interval * fps))
+        self.warmup_frames = int(warmup_seconds * fps)
+        self.comb_beats = comb_beats
+
+        self.window = np.hanning(frame_size).astype(np.float32)
+        self.envelope = AudioRingBuffer(int(history_seconds * fps))
+        self.frame_durations = deque(maxlen=100000)
+
+        self.queue = queue.Queue()
+        self.thread = None
+        self.running = False
+        self.reset()
+
+    def reset(self):
+        """Forget all audio and tracking state."""
+        self.envelope.reset()
+        self._pending = np.zeros(self.frame_size - self.hop_size, dtype=np.float32)
+        self._prev_spectrum = None
+        self.frame_idx = 0
+        self.frame_time = None
+        self.period = None  # Beat period in frames
+        self.next_beat = None  # Frame index of the next beat
+        self.last_beat = None
+        self.tempo_confidence = 0.0
+
+    @property
+    def bpm(self):
+        """Current tempo estimate (None until the engine has locked on)."""
+        return 60.0 * self.fps / self.period if self.period else None
+
+    def push(self, block, sample_index=None):
+        """Subscriber entry point for `AudioCapture`."""
+        self.queue.put((np.array(block, dtype=np.float32), time.perf_counter()))
+
+    def process(self, samples):
+        """Analyse new samples; returns the list of beat frame indices emitted."""
+        self._pending = np.concatenate((self._pending, samples))
+        if len(self._pending) < self.frame_size:
+            return []
+
+        frames = np.lib.stride_tricks.sliding_window_view(self._pending, self.frame_size)[::self.hop_size]
+        self._pending = self._pending[len(frames) * self.hop_size:].copy()
+
+        spectrum = np.log1p(100.0 * np.abs(np.fft.rfft(frames * self.window, axis=1)))
+        if self._prev_spectrum is None:
+            self._prev_spectrum = spectrum[0]
+        flux = np.maximum(0.0, np.diff(np.vstack((self._prev_spectrum, spectrum)), axis=0)).sum(axis=1)
+        self._prev_spectrum = spectrum[-1]
+
+        beats = []
+        for value in flux:
+            self.envelope.write((value,))
+            self.frame_idx += 1
+            if self.frame_idx % self.tempo_interval == 0 and len(self.envelope) >= self.warmup_frames:
+                self._update_tempo()
+            if self.next_beat is not None and self.frame_idx >= self.next_beat:
+                beats.append(self.next_beat)
+                self.last_beat = self.next_beat
+                self.next_beat += self.period
+        return beats
+
+    def _update_tempo(self):
+        """Re-estimate tempo by autocorrelation and re-align the phase with a comb."""
+        env = self.envelope.latest(len(self.envelope)).astype(float)
+        env = env - env.mean()
+        energy = np.dot(env, env)
+        if energy <= 0:
+            return
+
+        lags = np.arange(self.min_lag, self.max_lag + 1)
+        acf = np.array([np.dot(env[lag:], env[:-lag]) for lag in lags]) / energy
+        best = int(np.argmax(acf))
+        period = float(lags[best])
+        if 0 < best < len(acf) - 1:
+            # Parabolic interpolation for a sub-frame period
+            a, b, c = acf[best - 1], acf[best], acf[best + 1]
+            denom = a - 2 * b + c
+            if denom != 0:
+                period += 0.5 * (a - c) / denom
+        self.period = period
+        self.tempo_confidence = float(acf[best])
+
+        # Phase: offset (frames before now) whose comb over the last beats collects most flux
+        span = int(np.ceil(period))
+        offsets = np.arange(span)
+        taps = (offsets[:, None] + np.round(np.arange(self.comb_beats) * period)[None, :]).astype(int)
+        taps = np.clip(len(env) - 1 - taps, 0, len(env) - 1)
+        phase = int(np.argmax(env[taps].sum(axis=1)))
+        next_beat = self.frame_idx - 1 - phase + period
+        if self.last_beat is not None and next_beat - self.last_beat < 0.5 * period:
+            next_beat += period  # Don't fire twice for the same beat
+        self.next_beat = next_beat
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            try:
+                block, self.frame_time = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            first_frame = self.frame_idx
+            beats = self.process(block)
+            frames = self.frame_idx - first_frame
+            if frames:
+                self.frame_durations.extend([(time.perf_counter() - start) / frames] * frames)
+            for beat in beats:
+                beat_time = beat / self.fps
+                self.on_beats(np.array([beat_time]), self.frame_idx / self.fps, self.frame_time, start)
+
+    def start(self, capture):
+        """Subscribe to the capture and start the analysis thread."""
+        self.running = True
+        capture.subscribe(self.push)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log_engine.info("Spectral flux beat engine started.")
+
+    def stop(self, capture):
+        """Unsubscribe, process the queued audio and join the thread."""
+        if self.thread is None:
+            return
+        capture.subscribers.remove(self.push)
+        self.running = False
+        self.thread.join()
+        self.thread = None
+        log_engine.info("Spectral flux beat engine stopped.")
@@ -0,0 +1,176 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+
+log_bridge = logging.getLogger("EventBridge")
+
+KEEP = "keep"  # Never dropped (may exceed the capacity; counted as overflow)
+LATEST = "latest"  # At most one pending event per type; newer values replace older ones
+DROP = "drop"  # Discarded while the buffer is full
+
+
+class EventBridge:
+    """Bounded, batched handoff of detector events from worker threads to the asyncio loop.
+
+    `publish()` may be called from any thread; it appends to a typed event buffer and wakes
+    the loop only when no wakeup is pending. One consumer coroutine drains everything
+    queued in one batch and calls the registered handlers in publish order, so a burst of
+    events costs one loop wakeup instead of one future per event. Each event type has a
+    drop policy (KEEP, LATEST or DROP) and counters for enqueued, dropped, coalesced and
+    dispatched events plus the publish-to-dispatch lag. LATEST types may be given a rate:
+    the loop then dispatches them at most `rate` times per second, holding back the newest
+    value until the interval has passed.
+    """
+
+    def __init__(self, loop, capacity=256):
+        """
+        :param loop: Loop the handlers run on.
+        :param capacity: Maximum number of queued events before DROP events are discarded.
+        """
+        self.loop = loop
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.queue = deque()  # (type, payload, publish time); LATEST types queue a placeholder
+        self.latest = {}  # type -> (payload, publish time) of LATEST types
+        self.handlers = {}
+        self.policies = {}
+        self.intervals = {}  # type -> minimum seconds between dispatches (rate limited LATEST types)
+        self._last_dispatch = {}
+        self.counters = {}
+        self.future = None
+        self._wakeup = asyncio.Event()
+        self._wakeup_scheduled = False
+
+        self.batches = 0
+        self.max_batch = 0
+        self.max_queue_depth = 0
+
+    def register(self, kind, handler, policy=KEEP, rate=None):
+        """Route events of type `kind` to `handler(payload)` (plain function or coroutine function).
+
+        :param rate: Maximum dispatches per second of a LATEST type (None = every wakeup).
+        """
+        if rate is not None and policy != LATEST:
+            raise ValueError("Only LATEST events can be rate limited.")
+        self.handlers[kind] = handler
+        self.policies[kind] = policy
+        if rate is not None:
+            self.intervals[kind] = 1.0 / rate
+            self._last_dispatch[kind] = 0.0
+        self.counters[kind] = {"enqueued": 0, "dropped": 0, "coalesced": 0, "overflow": 0,
+                               "dispatched": 0, "lag_total": 0.0, "lag_max": 0.0}
+
+    def publish(self, kind, payload=None):
+        """Queue an event from any thread."""
+        now = time.perf_counter()
+        with self.lock:
+            counters = self.counters[kind]
+            counters["enqueued"] += 1
+            policy = self.policies[kind]
+            if policy == LATEST:
+                pending = kind in self.latest
+                self.latest[kind] = (payload, now)
+                if pending:
+                    counters["coalesced"] += 1
+                    return
+                self.queue.append((kind, None, None))
+            elif len(self.queue) >= self.capacity:
+                if policy == DROP:
+                    counters["dropped"] += 1
+                    return
+                counters["overflow"] += 1
+                self.queue.append((kind, payload, now))
+            else:
+                self.queue.append((kind, payload, now))
+
+            self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+            wake = not self._wakeup_scheduled
+            self._wakeup_scheduled = True
+
+        if wake:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        """Start the consumer on the loop (call from any thread)."""
+        if self.future is None:
+            self.future = asyncio.run_coroutine_threadsafe(self._consume(), self.loop)
+
+    def stop(self):
+        """Stop the consumer; events still queued are discarded."""
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+    async def _consume(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            with self.lock:
+                batch = list(self.queue)
+                self.queue.clear()
+                latest = self.latest
+                self.latest = {}
+                self._wakeup_scheduled = False
+
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            for kind, payload, published in batch:
+                if published is None:
+                    payload, published = latest[kind]
+                    if kind in self.intervals and self._hold_back(kind, payload, published):
+                        continue
+                counters = self.counters[kind]
+                lag = time.perf_counter() - published
+                counters["dispatched"] += 1
+                counters["lag_total"] += lag
+                counters["lag_max"] = max(counters["lag_max"], lag)
+                try:
+                    result = self.handlers[kind](payload)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    log_bridge.error(f"Handler for {kind} events failed: {e}")
+
+    def _hold_back(self, kind, payload, published):
+        """Keep a rate limited value pending until its interval has passed (runs on the loop)."""
+        now = time.perf_counter()
+        due = self._last_dispatch[kind] + self.intervals[kind]
+        if now >= due:
+            self._last_dispatch[kind] = now
+            return False
+        with self.lock:
+            if kind in self.latest:
+                self.counters[kind]["coalesced"] += 1  # A newer value is already queued
+                return True
+            self.latest[kind] = (payload, published)  # Later publishes replace it without queueing
+        self.loop.call_later(due - now, self._release, kind)
+        return True
+
+    def _release(self, kind):
+        with self.lock:
+            if kind not in self.latest:
+                return
+            self.queue.append((kind, None, None))
+            self._wakeup_scheduled = True
+        self._wakeup.set()
+
+    def getStats(self):
+        """Per-type counters with lag in milliseconds, plus batch and queue depth figures."""
+        stats = {"batches": self.batches, "max_batch": self.max_batch,
+                 "queue_depth": len(self.queue), "max_queue_depth": self.max_queue_depth}
+        for kind, counters in self.counters.items():
+            dispatched = counters["dispatched"]
+            stats[kind] = {
+                "policy": self.policies[kind],
+                "enqueued": counters["enqueued"],
+                "dispatched": dispatched,
+                "dropped": counters["dropped"],
+                "coalesced": counters["coalesced"],
+                "overflow": counters["overflow"],
+                "mean_lag_ms": counters["lag_total"] / dispatched * 1000.0 if dispatched else 0.0,
+                "max_lag_ms": counters["lag_max"] * 1000.0,
+            }
+        return stats
@@ -0,0 +1,89 @@
+import numpy as np
+from .ring_buffer import AudioRingBuffer
+from .stft import StreamingStft
+from .onset import StreamingOnsetDetector
+
+
+class SpectralFeatures:
+    """Shared feature stage: one windowed FFT per hop, cached in a rolling spectrogram.
+
+    Every new frame is transformed once; the onset envelope (mel spectral flux), the RMS
+    level, the low-band energy ratio and the spectral centroid are all derived from that
+    cached power spectrum. Per-frame features are kept in rolling buffers of
+    `history_frames` entries, aligned with the spectrogram (oldest first).
+    """
+
+    def __init__(self, sr=44100, n_fft=2048, hop_length=512, history_frames=259, low_band_hz=150.0,
+                 **onset_kwargs):
+        """
+        :param history_frames: Frames kept in the spectrogram and feature buffers.
+        :param low_band_hz: Upper edge of the band used for the low-band energy ratio (kick drum range).
+        :param onset_kwargs: Peak picking parameters passed to StreamingOnsetDetector.
+        """
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.history_frames = history_frames
+
+        self.stft = StreamingStft(n_fft, hop_length)
+        self.onset = StreamingOnsetDetector(sr=sr, n_fft=n_fft, hop_length=hop_length,
+                                            history_frames=history_frames, **onset_kwargs)
+
+        bins = n_fft // 2 + 1
+        self.frequencies = np.fft.rfftfreq(n_fft, 1.0 / sr).astype(np.float32)
+        self.low_band = self.frequencies <= low_band_hz
+        # Parseval: windowed frame energy from the one-sided power spectrum, normalised by the window energy
+        self._energy_weights = np.full(bins, 2.0, dtype=np.float32)
+        self._energy_weights[0] = self._energy_weights[-1] = 1.0
+        self._energy_weights /= n_fft * float(np.sum(self.stft.window.astype(np.float64) ** 2))
+
+        self.spectrogram = AudioRingBuffer(history_frames, frame_shape=(bins,))
+        self.rms_buffer = AudioRingBuffer(history_frames)
+        self.low_ratio_buffer = AudioRingBuffer(history_frames)
+        self.centroid_buffer = AudioRingBuffer(history_frames)
+
+    def reset(self):
+        self.stft.reset()
+        self.onset.reset()
+        for buffer in (self.spectrogram, self.rms_buffer, self.low_ratio_buffer, self.centroid_buffer):
+            buffer.reset()
+
+    @property
+    def total_frames(self):
+        return self.stft.total_frames
+
+    def process(self, samples):
+        """Consume new audio samples and return the number of new frames."""
+        power = self.stft.process(samples)
+        if len(power) == 0:
+            return 0
+
+        self.spectrogram.write(power)
+        self.onset.process_spectrum(power)
+
+        total = power.sum(axis=1)
+        magnitude = np.sqrt(power)
+        self.rms_buffer.write(np.sqrt(power @ self._energy_weights))
+        self.low_ratio_buffer.write(power[:, self.low_band].sum(axis=1) / np.maximum(total, 1e-10))
+        self.centroid_buffer.write((magnitude @ self.frequencies) / np.maximum(magnitude.sum(axis=1), 1e-10))
+        return len(power)
+
+    def _latest(self, buffer, n):
+        n = min(len(buffer), buffer.capacity if n is None else n)
+        return buffer.latest(n)
+
+    def rms(self, n=None):
+        """RMS level of the newest `n` frames (default: the whole history)."""
+        return self._latest(self.rms_buffer, n)
+
+    def low_band_ratio(self, n=None):
+        """Share of the power below `low_band_hz` for the newest `n` frames."""
+        return self._latest(self.low_ratio_buffer, n)
+
+    def centroid(self, n=None):
+        """Spectral centroid in Hz of the newest `n` frames."""
+        return self._latest(self.centroid_buffer, n)
+
+    def spectrum(self, n=None):
+        """Newest `n` power spectra, shape (n, bins)."""
+        return self._latest(self.spectrogram, n)
@@ -0,0 +1,278 @@
+import os
+import queue
+import threading
+import logging
+import time
+import multiprocessing as mp
+from collections import deque
+import numpy as np
+from madmom.features.beats import DBNBeatTrackingProcessor, RNNBeatProcessor
+from madmom.processors import IOProcessor
+from madmom.audio.signal import Signal
+from .capture import MadmomFrameSource
+from .engines import BeatEngine
+from .ring_buffer import SharedAudioRing
+
+log_madmom = logging.getLogger("MadmomProcessor")
+
+WARMUP_FRAMES = 10  # Silent frames pushed through the RNN before real audio
+FRAME_SIZE = 2048  # MadmomFrameSource default
+
+
+def build_madmom_processor(kwargs, beat_callback):
+    """Create the online RNN + DBN beat tracking pipeline ending in `beat_callback(beats, output)`."""
+    in_processor = RNNBeatProcessor(**kwargs)
+    beat_processor = DBNBeatTrackingProcessor(**kwargs)
+    return IOProcessor(in_processor, [beat_processor, beat_callback])
+
+
+def warm_up_processor(processor, sample_rate, frames=WARMUP_FRAMES):
+    """Run `frames` frames of silence through the online pipeline.
+
+    The first inference allocates the network buffers and fills the caches of the
+    spectrogram stages, which otherwise delays the first real beat. The caller has to
+    ignore beats reported meanwhile and pass `reset=True` with the first real frame, so
+    the network, spectrogram and DBN state start from scratch.
+    """
+    silence = np.zeros(FRAME_SIZE, dtype=np.float32)
+    for i in range(frames):
+        frame = Signal(silence, sample_rate=sample_rate, dtype=np.float32, num_channels=1)
+        processor.process(frame, None, reset=(i == 0))
+
+
+class MadmomThreadRunner(BeatEngine):
+    """Runs the madmom pipeline in a daemon thread of the current interpreter.
+
+    Detected beats are reported as `on_beats(beats, stream_time, frame_time, frame_start)`:
+    the beat times, the audio position of the processed frame, the arrival time of its
+    newest samples and the time processing of the frame started (both perf_counter()).
+    """
+
+    def __init__(self, kwargs, on_beats, sample_rate=44100):
+        self.kwargs = kwargs
+        self.on_beats = on_beats
+        self.sample_rate = sample_rate
+        self.fps = kwargs["fps"]
+        self.processor = build_madmom_processor(kwargs, self._beat_callback)
+        self.frame_source = None
+        self.thread = None
+        self.frame_durations = deque(maxlen=100000)  # Seconds spent per madmom frame
+        self._frame_start = None
+        self._warming_up = False
+        self._reset = False  # Reset the pipeline state with the next frame (after the warm-up)
+
+    def warm_up(self):
+        start = time.perf_counter()
+        self._warming_up = True
+        try:
+            warm_up_processor(self.processor, self.sample_rate)
+        finally:
+            self._warming_up = False
+        self._reset = True
+        log_madmom.info(f"Madmom warm-up took {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+    def _beat_callback(self, beats, output=None):
+        if len(beats) > 0 and not self._warming_up:
+            self.on_beats(beats, self.frame_source.stream_time(), self.frame_source.frame_time, self._frame_start)
+
+    def _run(self):
+        for frame in self.frame_source:
+            self._frame_start = time.perf_counter()
+            self.processor.process(frame, None, reset=self._reset)
+            self._reset = False
+            self.frame_durations.append(time.perf_counter() - self._frame_start)
+
+    def start(self, capture):
+        """Subscribe to the capture and start processing."""
+        self.frame_source = MadmomFrameSource(sample_rate=self.sample_rate, fps=self.kwargs["fps"])
+        capture.subscribe(self.frame_source.push)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log_madmom.info("Madmom beat detection thread started.")
+
+    def stop(self, capture):
+        """Unsubscribe, let the queued audio be processed and join the thread."""
+        if self.thread is None:
+            return
+        capture.subscribers.remove(self.frame_source.push)
+        self.frame_source.stop()
+        self.thread.join()
+        self.thread = None
+        log_madmom.info("Madmom thread stopped.")
+
+
+def _worker_main(ring_name, capacity, kwargs, sample_rate, events, stop_event, data_ready, cpu_affinity):
+    """Entry point of the madmom worker process."""
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_affinity)
+
+    ring = SharedAudioRing(capacity, name=ring_name, create=False)
+    frame_source = MadmomFrameSource(sample_rate=sample_rate, fps=kwargs["fps"])
+    state = {"frame_start": None, "warming_up": True}
+
+    def feed():
+        # The parent sets the ring's total to the capture position and signals when it subscribes.
+        # Start at the current total; everything before it counts as skipped stream time.
+        while not data_ready.wait(0.1):
+            if stop_event.is_set():
+                break
+        position = int(ring.total[0])
+        frame_source.skip(position)
+        while True:
+            stopping = stop_event.is_set()
+            data_ready.clear()
+            block, position, dropped = ring.read(position)
+            if dropped:
+                events.put(("dropped", dropped))
+                frame_source.skip(dropped)
+            if len(block):
+                frame_source.push(block)
+            if stopping:
+                break
+            data_ready.wait(0.1)
+        frame_source.stop()
+
+    def beat_callback(beats, output=None):
+        if len(beats) > 0 and not state["warming_up"]:
+            events.put(("beats", np.asarray(beats), frame_source.stream_time(), frame_source.frame_time, state["frame_start"]))
+
+    load_start = time.perf_counter()
+    processor = build_madmom_processor(kwargs, beat_callback)
+    warm_up_start = time.perf_counter()
+    warm_up_processor(processor, sample_rate)
+    state["warming_up"] = False
+    events.put(("ready", warm_up_start - load_start, time.perf_counter() - warm_up_start))
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    durations = []
+    reset = True
+    last_report = time.perf_counter()
+    for frame in frame_source:
+        state["frame_start"] = time.perf_counter()
+        processor.process(frame, None, reset=reset)
+        reset = False
+        now = time.perf_counter()
+        durations.append(now - state["frame_start"])
+        if now - last_report > 1.0:
+            events.put(("stats", durations))
+            durations = []
+            last_report = now
+
+    feeder.join()
+    events.put(("stats", durations))
+    events.put(("stopped",))
+    ring.close()
+
+
+class MadmomProcessRunner(BeatEngine):
+    """Runs the madmom pipeline in a separate worker process.
+
+    Audio goes to the worker through a `SharedAudioRing`; beats and frame timing come back
+    through a multiprocessing queue and are delivered from a receiver thread with the same
+    `on_beats` signature as `MadmomThreadRunner`.
+    """
+
+    def __init__(self, kwargs, on_beats, sample_rate=44100, ring_seconds=2.0, cpu_affinity=None):
+        """
+        :param ring_seconds: Capacity of the shared audio ring.
+        :param cpu_affinity: Optional set of CPU ids the worker process is pinned to.
+        """
+        self.kwargs = kwargs
+        self.on_beats = on_beats
+        self.sample_rate = sample_rate
+        self.fps = kwargs["fps"]
+        self.capacity = int(ring_seconds * sample_rate)
+        self.cpu_affinity = cpu_affinity
+        self.frame_durations = deque(maxlen=100000)
+        self.samples_dropped = 0
+        self.ring = None
+        self.process = None
+        self.receiver = None
+
+    def push(self, block, sample_index=None):
+        """Subscriber entry point for `AudioCapture`."""
+        self.ring.write(block)
+        self.data_ready.set()
+
+    def _receive(self):
+        while True:
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    log_madmom.error("Madmom worker process exited unexpectedly.")
+                    break
+                continue
+
+            if event[0] == "beats":
+                self.on_beats(*event[1:])
+            elif event[0] == "stats":
+                self.frame_durations.extend(event[1])
+            elif event[0] == "dropped":
+                self.samples_dropped += event[1]
+                log_madmom.warning(f"Madmom worker fell behind, {event[1]} samples dropped.")
+            elif event[0] == "stopped":
+                break
+
+    def warm_up(self):
+        """Create the shared ring, spawn the worker and wait until its models are loaded and warm.
+
+        Nothing is written to the ring before start(), so a capture that is already running
+        cannot overrun it while the worker loads.
+        """
+        if self.process is not None:
+            return
+        ctx = mp.get_context("spawn")
+        self.ring = SharedAudioRing(self.capacity)
+        self.events = ctx.Queue()
+        self.stop_event = ctx.Event()
+        self.data_ready = ctx.Event()
+        self.process = ctx.Process(
+            target=_worker_main, name="MadmomWorker", daemon=True,
+            args=(self.ring.name, self.capacity, self.kwargs, self.sample_rate,
+                  self.events, self.stop_event, self.data_ready, self.cpu_affinity),
+        )
+        self.process.start()
+        log_madmom.info(f"Madmom worker process started (pid {self.process.pid}).")
+
+        while True:
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError("Madmom worker process exited during startup.") from None
+                continue
+            if event[0] == "ready":
+                log_madmom.info(f"Madmom worker ready (model load {event[1] * 1000:.0f} ms, "
+                                f"warm-up {event[2] * 1000:.0f} ms).")
+                return
+
+    def start(self, capture):
+        """Start the worker if warm_up() was not called, then subscribe to the capture."""
+        self.warm_up()
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.receiver.start()
+        self.ring.total[0] = capture.samples_captured  # Ring positions follow the capture's sample index
+        capture.subscribe(self.push)
+        self.data_ready.set()
+
+    def stop(self, capture):
+        """Stop feeding, let the worker finish the queued audio and release the ring."""
+        if self.process is None:
+            return
+        if self.push in capture.subscribers:
+            capture.subscribers.remove(self.push)
+        self.stop_event.set()
+        self.data_ready.set()
+        if self.receiver is not None:
+            self.receiver.join()
+            self.receiver = None
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+        self.ring.unlink()
+        self.process = None
+        log_madmom.info("Madmom worker process stopped.")
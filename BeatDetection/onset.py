@@ -0,0 +1,125 @@
+import numpy as np
+from .ring_buffer import AudioRingBuffer
+from .stft import StreamingStft
+
+
+class StreamingOnsetDetector:
+    """Incremental mel spectral-flux onset envelope with an online peak picker.
+
+    Produces the same envelope as `librosa.onset.onset_strength` (mel power spectrogram,
+    dB scaling, lag-1 positive flux, mean over bands, centered frames) but only transforms
+    the frames that became available since the last call. Peaks are picked with the
+    `librosa.util.peak_pick` rules as soon as enough look-ahead frames have arrived.
+    `process_spectrum()` accepts power spectra from a shared StreamingStft instead of audio.
+    """
+
+    def __init__(self, sr=44100, n_fft=2048, hop_length=512, n_mels=128, history_frames=259,
+                 pre_max=10, post_max=10, pre_avg=5, post_avg=5, delta=0.7, wait=10, top_db=80.0):
+        """
+        :param history_frames: Length of the rolling onset envelope in frames.
+        :param pre_max/post_max/pre_avg/post_avg/delta/wait: Peak picking parameters (see librosa.util.peak_pick).
+        :param top_db: Dynamic range below the loudest recent frame that is kept in the dB spectrum.
+        """
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.history_frames = history_frames
+        self.pre_max = pre_max
+        self.post_max = post_max
+        self.pre_avg = pre_avg
+        self.post_avg = post_avg
+        self.delta = delta
+        self.wait = wait
+        self.top_db = top_db
+
+        self.stft = None  # Created by process(); process_spectrum() callers bring their own STFT
+        import librosa.filters  # Slow to import; only needed for the mel filterbank
+
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels, fmax=0.5 * sr)
+
+        self.envelope_buffer = AudioRingBuffer(history_frames)
+        self.frame_max_db = AudioRingBuffer(history_frames)  # Loudest band per frame, for top_db clipping
+        self.peak_frames = []  # Absolute envelope indices of picked peaks inside the history
+        self.reset()
+
+    def reset(self):
+        """Forget all audio and start a new stream."""
+        self.envelope_buffer.reset()
+        self.frame_max_db.reset()
+        self.frame_max_db.write(np.full(self.history_frames, -np.inf))
+        self.peak_frames.clear()
+
+        if self.stft is not None:
+            self.stft.reset()
+        self._prev_db = None
+        self._next_candidate = 0
+        self._last_peak = None
+
+        # librosa pads the envelope by lag + n_fft // (2 * hop) leading zeros
+        self.envelope_buffer.write(np.zeros(1 + self.n_fft // (2 * self.hop_length)))
+
+    @property
+    def total_frames(self):
+        """Number of envelope values produced since the last reset."""
+        return self.envelope_buffer.total_written
+
+    @property
+    def envelope(self):
+        """Read-only view of the rolling onset envelope (oldest first)."""
+        return self.envelope_buffer.latest(len(self.envelope_buffer))
+
+    @property
+    def peaks(self):
+        """Indices into `envelope` of the peaks picked inside the current history."""
+        first = self.total_frames - len(self.envelope_buffer)
+        return np.asarray(self.peak_frames, dtype=int) - first
+
+    def process(self, samples):
+        """Consume new audio samples and return the number of new envelope frames."""
+        if self.stft is None:
+            self.stft = StreamingStft(self.n_fft, self.hop_length)
+        return self.process_spectrum(self.stft.process(samples))
+
+    def process_spectrum(self, spectrum):
+        """Consume power spectra of new frames, shape (frames, n_fft // 2 + 1); returns the new envelope frames."""
+        if len(spectrum) == 0:
+            return 0
+
+        mel_db = 10.0 * np.log10(np.maximum(1e-10, self.mel_basis @ spectrum.T))  # (n_mels, frames)
+
+        self.frame_max_db.write(mel_db.max(axis=0))
+        floor = self.frame_max_db.latest().max() - self.top_db
+        mel_db = np.maximum(mel_db, floor)
+
+        if self._prev_db is not None:
+            mel_db = np.concatenate((self._prev_db[:, None], mel_db), axis=1)
+        self._prev_db = mel_db[:, -1].copy()
+
+        flux = np.maximum(0.0, np.diff(mel_db, axis=1)).mean(axis=0)
+        self.envelope_buffer.write(flux)
+        self._pick_peaks()
+        return len(flux)
+
+    def _pick_peaks(self):
+        """Decide every candidate frame whose look-ahead window is complete."""
+        total = self.total_frames
+        first = total - len(self.envelope_buffer)
+        lookahead = max(self.post_max, self.post_avg)
+        env = self.envelope
+
+        # Drop peaks that scrolled out of the history
+        while self.peak_frames and self.peak_frames[0] < first:
+            self.peak_frames.pop(0)
+
+        n = max(self._next_candidate, first)
+        while n + lookahead <= total:
+            i = n - first
+            if env[i] == env[max(0, i - self.pre_max):i + self.post_max].max() and \
+                    env[i] >= env[max(0, i - self.pre_avg):i + self.post_avg].mean() + self.delta and \
+                    (self._last_peak is None or n - self._last_peak > self.wait):
+                self.peak_frames.append(n)
+                self._last_peak = n
+                n += self.wait + 1
+            else:
+                n += 1
+        self._next_candidate = n
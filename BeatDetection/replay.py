@@ -0,0 +1,254 @@
+import threading
+import logging
+import time
+import numpy as np
+from .capture import AudioCapture
+
+log_replay = logging.getLogger("Replay")
+
+
+class ReplayCapture(AudioCapture):
+    """Drop-in `AudioCapture` that plays an audio array instead of recording a device.
+
+    Blocks are pushed through the same subscriber path as live audio, either as fast as
+    possible or paced to real time. Without real-time pacing, an optional `throttle`
+    callable is invoked after every block and may block until the consumers are ready for
+    the next one.
+    """
+
+    def __init__(self, audio, sample_rate=44100, blocksize=2048, realtime=False):
+        super().__init__(sample_rate=sample_rate, blocksize=blocksize)
+        self.audio = np.asarray(audio, dtype=np.float32)
+        self.realtime = realtime
+        self.throttle = None
+        self.blocks_fed = 0
+        self.finished = threading.Event()
+        self.start_wall_time = None
+        self._running = False
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, sample_rate=44100, **kwargs):
+        """Load a (mono, resampled) audio file for replay."""
+        import librosa  # Only needed for decoding files
+
+        audio, _ = librosa.load(path, sr=sample_rate, mono=True)
+        return cls(audio, sample_rate=sample_rate, **kwargs)
+
+    def duration(self):
+        """Length of the replayed audio in seconds."""
+        return len(self.audio) / self.sample_rate
+
+    def _feed(self):
+        """Push the audio block by block, optionally sleeping to match real time."""
+        self.start_wall_time = time.perf_counter()
+        self.blocks_fed = 0
+        for start in range(0, len(self.audio), self.blocksize):
+            if not self._running:
+                break
+            if self.realtime:
+                due = self.start_wall_time + start / self.sample_rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.push(self.audio[start:start + self.blocksize])
+            self.blocks_fed += 1
+            if self.throttle and not self.realtime:
+                self.throttle()
+        self.finished.set()
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._feed, daemon=True)
+            self._thread.start()
+            log_replay.info(f"Replaying {self.duration():.1f}s of audio (realtime={self.realtime}).")
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+def load_beat_annotations(path):
+    """Read beat times (first column, seconds) from a .beats/.txt annotation file."""
+    return np.atleast_1d(np.loadtxt(path, usecols=0, ndmin=1))
+
+
+def _summary_ms(values):
+    """Mean/percentile summary of durations given in seconds."""
+    if len(values) == 0:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000.0
+    return {
+        "count": len(ms),
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "max": float(ms.max()),
+    }
+
+
+def evaluate_beats(detections, annotations, tolerance=0.07):
+    """Match detections to annotated beats within `tolerance` seconds (one-to-one, in order)."""
+    detections = np.asarray(detections, dtype=float)
+    annotations = np.asarray(annotations, dtype=float)
+    matched = 0
+    used = np.zeros(len(detections), dtype=bool)
+    for beat in annotations:
+        if len(detections) == 0:
+            break
+        distance = np.abs(detections - beat)
+        distance[used] = np.inf
+        best = int(np.argmin(distance))
+        if distance[best] <= tolerance:
+            used[best] = True
+            matched += 1
+
+    precision = matched / len(detections) if len(detections) else 0.0
+    recall = matched / len(annotations) if len(annotations) else 0.0
+    f_measure = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"matched": matched, "precision": precision, "recall": recall, "f_measure": f_measure}
+
+
+class ReplayHarness:
+    """Runs a `BeatDetector` on a `ReplayCapture` and collects timing and accuracy data."""
+
+    def __init__(self, detector_factory, capture, annotations=None, tolerance=0.07):
+        """
+        :param detector_factory: Callable taking `capture=` and returning a BeatDetector.
+        :param capture: ReplayCapture holding the audio to play.
+        :param annotations: Optional array of annotated beat times in seconds.
+        """
+        self.capture = capture
+        self.annotations = None if annotations is None else np.asarray(annotations, dtype=float)
+        self.tolerance = tolerance
+        self.detector = detector_factory(capture=capture)
+
+        self.chunk_times = []
+        self.beats = []  # (beat_time, detected_at_stream_time, detected_at_wall_time)
+        self.switches = []
+        self.blocks_missed = 0  # Replayed blocks the classifier never analysed
+
+        self.detector.beat_listeners.append(self._on_beats)
+        if not capture.realtime:
+            capture.throttle = self._wait_for_classifier
+        self.detector.classification_listeners.append(lambda state, t: self.switches.append((t, state)))
+        self._instrument()
+
+    def _instrument(self):
+        """Wrap the detector's per-chunk processing with a timer (engine frames time themselves)."""
+        process_chunk = self.detector.process_chunk
+
+        def timed_chunk(new_data):
+            start = time.perf_counter()
+            process_chunk(new_data)
+            self.chunk_times.append(time.perf_counter() - start)
+
+        self.detector.process_chunk = timed_chunk
+
+    def _wait_for_classifier(self):
+        """Hold the feed until the classification thread has analysed the queued block.
+
+        Otherwise a fast replay floods the queue, the classifier sees a few huge batches and
+        its hysteresis (counted per processed chunk) no longer behaves like on live audio.
+        """
+        self.detector.audio_queue.join()
+
+    def _on_beats(self, beats, stream_time):
+        wall = time.perf_counter() - self.capture.start_wall_time
+        for beat in np.atleast_1d(beats):
+            self.beats.append((float(beat), stream_time, wall))
+
+    def run(self, useBeatClassification=True):
+        """Replay the whole input and return the report dictionary."""
+        detector = self.detector
+        detector.run(useBeatClassification=useBeatClassification)
+        self.capture.finished.wait()
+
+        # Let the beat engine consume everything that was captured before shutting down
+        detector.engine.stop(self.capture)
+        detector.audio_queue.join()
+        wall_seconds = time.perf_counter() - self.capture.start_wall_time
+        detector.stop()
+        if useBeatClassification:
+            self.blocks_missed = self.capture.blocks_fed - detector.blocks_processed
+            if self.blocks_missed:
+                log_replay.warning(f"Classifier saw {detector.blocks_processed} of {self.capture.blocks_fed} blocks.")
+        return self.report(wall_seconds)
+
+    def report(self, wall_seconds):
+        """Build the latency/accuracy report."""
+        beat_times = [beat for beat, _, _ in self.beats]
+        audio_seconds = self.capture.duration()
+        report = {
+            "audio_seconds": audio_seconds,
+            "wall_seconds": wall_seconds,
+            "realtime_factor": audio_seconds / wall_seconds if wall_seconds else 0.0,
+            "chunk_ms": _summary_ms(self.chunk_times),
+            "engine_frame_ms": _summary_ms(self.detector.engine.frame_durations),
+            "beats_detected": len(beat_times),
+            "beat_times": beat_times,
+            "classification_switches": self.switches,
+            "engine_cpu": self.detector.engine.cpu_stats(),
+            "batch_stats": self.detector.get_batch_stats(),
+            "classifier_blocks_missed": self.blocks_missed,
+        }
+
+        if self.annotations is not None:
+            report["accuracy"] = evaluate_beats(beat_times, self.annotations, self.tolerance)
+            stream_delays, wall_delays = [], []
+            for annotated in self.annotations:
+                hits = [(s, w) for beat, s, w in self.beats if abs(beat - annotated) <= self.tolerance]
+                if hits:
+                    stream_delays.append(hits[0][0] - annotated)
+                    wall_delays.append(hits[0][1] - annotated)
+            report["detection_delay_ms"] = _summary_ms(stream_delays)  # In audio time
+            if self.capture.realtime:
+                report["wall_delay_ms"] = _summary_ms(wall_delays)
+        return report
+
+
+def format_report(report):
+    """Render a report as human readable text."""
+    lines = [
+        f"Audio: {report['audio_seconds']:.1f}s processed in {report['wall_seconds']:.1f}s "
+        f"({report['realtime_factor']:.1f}x realtime)",
+        f"Beats detected: {report['beats_detected']}",
+    ]
+    for key in ("chunk_ms", "engine_frame_ms", "detection_delay_ms", "wall_delay_ms"):
+        if key in report and report[key]["count"]:
+            stats = report[key]
+            lines.append(f"{key}: n={stats['count']} mean={stats['mean']:.2f} p50={stats['p50']:.2f} "
+                         f"p95={stats['p95']:.2f} max={stats['max']:.2f}")
+    if report.get("classifier_blocks_missed"):
+        lines.append(f"Classifier missed {report['classifier_blocks_missed']} blocks")
+    if report["engine_cpu"].get("frames"):
+        lines.append(f"Engine load: {report['engine_cpu']['load'] * 100:.1f}% of real time")
+    if "accuracy" in report:
+        acc = report["accuracy"]
+        lines.append(f"Accuracy: P={acc['precision']:.3f} R={acc['recall']:.3f} F={acc['f_measure']:.3f}")
+    for t, state in report["classification_switches"]:
+        lines.append(f"{t:8.2f}s -> {state.upper()}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    from .BeatDetector import BeatDetector
+
+    parser = argparse.ArgumentParser(description="Replay an audio file through BeatDetector.")
+    parser.add_argument("audio", help="Audio file to replay")
+    parser.add_argument("--beats", help="Beat annotation file (seconds, first column)")
+    parser.add_argument("--realtime", action="store_true", help="Pace the replay to real time")
+    parser.add_argument("--engine", default="madmom", choices=["madmom", "flux"], help="Beat tracking engine")
+    args = parser.parse_args()
+
+    replay = ReplayCapture.from_file(args.audio, realtime=args.realtime)
+    annotations = load_beat_annotations(args.beats) if args.beats else None
+    harness = ReplayHarness(
+        lambda capture: BeatDetector(vuCallback=lambda vu: None, capture=capture, engine=args.engine),
+        replay, annotations,
+    )
+    print(format_report(harness.run()))
@@ -0,0 +1,151 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Fixed-size circular audio buffer with zero-copy reads of the newest samples.
+
+    The storage is mirrored (every sample is written twice, `capacity` apart), so the
+    latest `n` samples are always available as one contiguous view without copying.
+    Appending a block costs O(block size), independent of the buffer capacity.
+    """
+
+    def __init__(self, capacity, dtype=np.float32, frame_shape=()):
+        """
+        :param capacity: Number of samples kept in the buffer.
+        :param dtype: Sample type of the underlying storage.
+        :param frame_shape: Shape of one entry, e.g. (bins,) to keep spectrogram frames.
+        """
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive.")
+
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.frame_shape = tuple(frame_shape)
+        self._storage = np.zeros((2 * self.capacity,) + self.frame_shape, dtype=self.dtype)
+        self._write_index = 0  # Position of the next sample in the primary half
+        self.total_written = 0  # Samples written since creation/reset
+
+    def __len__(self):
+        """Number of valid samples currently held."""
+        return min(self.total_written, self.capacity)
+
+    def write(self, block):
+        """Append a block of samples, overwriting the oldest ones."""
+        block = np.asarray(block, dtype=self.dtype).reshape((-1,) + self.frame_shape)
+        n = len(block)
+        if n == 0:
+            return
+
+        self.total_written += n
+        if n >= self.capacity:
+            # Only the newest `capacity` samples survive
+            block = block[-self.capacity:]
+            self._storage[:self.capacity] = block
+            self._storage[self.capacity:] = block
+            self._write_index = 0
+            return
+
+        start = self._write_index
+        end = start + n
+        cap = self.capacity
+        if end <= cap:
+            self._storage[start:end] = block
+            self._storage[start + cap:end + cap] = block
+        else:
+            first = cap - start
+            self._storage[start:cap] = block[:first]
+            self._storage[start + cap:] = block[:first]
+            self._storage[:n - first] = block[first:]
+            self._storage[cap:cap + n - first] = block[first:]
+
+        self._write_index = end % cap
+
+    def latest(self, n=None):
+        """Return a read-only contiguous view of the newest `n` samples (default: all)."""
+        n = self.capacity if n is None else int(n)
+        if not (0 <= n <= self.capacity):
+            raise ValueError(f"Requested {n} samples from a buffer of {self.capacity}.")
+
+        end = self._write_index + self.capacity
+        view = self._storage[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def segments(self, n=None):
+        """Return the newest `n` samples as (older, newer) views of the primary storage."""
+        n = self.capacity if n is None else int(n)
+        if not (0 <= n <= self.capacity):
+            raise ValueError(f"Requested {n} samples from a buffer of {self.capacity}.")
+
+        start = self._write_index - n
+        if start >= 0:
+            first = self._storage[start:self._write_index]
+            second = self._storage[:0]
+        else:
+            first = self._storage[self.capacity + start:self.capacity]
+            second = self._storage[:self._write_index]
+
+        first.flags.writeable = False
+        second.flags.writeable = False
+        return first, second
+
+    def reset(self):
+        """Clear the buffer back to silence."""
+        self._storage.fill(0)
+        self._write_index = 0
+        self.total_written = 0
+
+
+class SharedAudioRing:
+    """Single-writer audio ring in shared memory.
+
+    Layout: one int64 with the total number of samples written, followed by `capacity`
+    float32 samples. Readers keep their own position and copy out what is new.
+    """
+
+    def __init__(self, capacity, name=None, create=True):
+        self.capacity = int(capacity)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=8 + 4 * self.capacity)
+        self.name = self.shm.name
+        self.total = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.samples = np.ndarray((self.capacity,), dtype=np.float32, buffer=self.shm.buf, offset=8)
+        if create:
+            self.total[0] = 0
+
+    def write(self, block):
+        """Append samples (publishing the new total only after the data is in place)."""
+        block = np.asarray(block, dtype=np.float32)
+        n = len(block)
+        if n >= self.capacity:
+            block = block[-self.capacity:]
+        total = int(self.total[0])
+        start = (total + n - len(block)) % self.capacity
+        first = min(len(block), self.capacity - start)
+        self.samples[start:start + first] = block[:first]
+        self.samples[:len(block) - first] = block[first:]
+        self.total[0] = total + n
+
+    def read(self, position):
+        """Return (new samples since `position`, new position, samples lost to overrun)."""
+        total = int(self.total[0])
+        available = total - position
+        dropped = max(0, available - self.capacity)
+        position += dropped
+        available -= dropped
+        if available <= 0:
+            return np.zeros(0, dtype=np.float32), position, dropped
+
+        start = position % self.capacity
+        first = min(available, self.capacity - start)
+        data = np.concatenate((self.samples[start:start + first], self.samples[:available - first]))
+        return data, total, dropped
+
+    def close(self):
+        # Drop the numpy views before closing, they hold exports of the buffer
+        self.total = None
+        self.samples = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
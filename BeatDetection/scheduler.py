@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import math
+import time
+
+log_scheduler = logging.getLogger("BeatScheduler")
+
+
+class PredictiveBeatScheduler:
+    """Fires lighting changes ahead of the predicted beat to cancel the output latency.
+
+    Runs on the asyncio loop. While the detector's tempo estimate is confident (and the
+    classifier is in "beats" mode), it calls `on_beat(beat_id, outputs)` for every group of
+    outputs at `predicted beat - output latency`. Outputs are objects with an
+    `output_latency` attribute in seconds (e.g. Ble2Led); None means not measured yet.
+    When the estimate is unstable `predictive` is False and the application should fall
+    back to reacting to detected beats.
+    """
+
+    def __init__(self, detector, on_beat, outputs, min_confidence=0.6, default_latency=0.02,
+                 extra_latency=0.0, latency_bucket=0.005, poll_interval=0.05):
+        """
+        :param detector: BeatDetector providing get_tempo_estimate().
+        :param on_beat: Coroutine function called as on_beat(beat_id, outputs).
+        :param outputs: Output devices; grouped by latency into buckets of `latency_bucket` seconds.
+        :param min_confidence: Tempo confidence needed for predictive mode.
+        :param default_latency: Latency assumed for outputs that have not been measured.
+        :param extra_latency: Constant added to every output (e.g. fixture response time).
+        """
+        self.detector = detector
+        self.on_beat = on_beat
+        self.outputs = outputs
+        self.min_confidence = min_confidence
+        self.default_latency = default_latency
+        self.extra_latency = extra_latency
+        self.latency_bucket = latency_bucket
+        self.poll_interval = poll_interval
+
+        self.predictive = False
+        self.running = False
+        self.beat_id = 0
+        self.last_target = None
+        self.predicted_beats = 0
+        self.late_dispatches = 0
+
+    def latency_groups(self):
+        """Return [(lead, [outputs])] sorted by decreasing lead time."""
+        groups = {}
+        for output in self.outputs:
+            latency = getattr(output, "output_latency", None)
+            lead = (self.default_latency if latency is None else latency) + self.extra_latency
+            bucket = round(lead / self.latency_bucket) * self.latency_bucket
+            groups.setdefault(bucket, []).append(output)
+        return sorted(groups.items(), key=lambda item: item[0], reverse=True)
+
+    def _confident(self, estimate):
+        return (estimate is not None and estimate["confidence"] >= self.min_confidence
+                and self.detector.classification_state == "beats")
+
+    async def run(self):
+        """Scheduling loop; cancel the task or call stop() to end it."""
+        self.running = True
+        while self.running:
+            estimate = self.detector.get_tempo_estimate()
+            if not self._confident(estimate):
+                if self.predictive:
+                    log_scheduler.info("Tempo unstable, falling back to reactive mode.")
+                self.predictive = False
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if not self.predictive:
+                log_scheduler.info(f"Predictive mode at {estimate['bpm']:.1f} BPM.")
+            self.predictive = True
+
+            groups = self.latency_groups()
+            max_lead = groups[0][0] if groups else 0.0
+            period = estimate["period"]
+            now = time.perf_counter()
+            k = math.ceil((now + max_lead - estimate["last_beat_wall"]) / period)
+            target = estimate["last_beat_wall"] + k * period
+            if self.last_target is not None and target - self.last_target < 0.5 * period:
+                target += period  # Already served this beat
+
+            # Wait for the earliest dispatch, then re-check the estimate (it may have moved)
+            delay = target - max_lead - time.perf_counter()
+            if delay > self.poll_interval:
+                await asyncio.sleep(min(delay - self.poll_interval, period / 2))
+                continue
+
+            self.beat_id += 1
+            self.last_target = target
+            self.predicted_beats += 1
+            for lead, outputs in groups:
+                delay = target - lead - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -0.005:
+                    self.late_dispatches += 1
+                await self.on_beat(self.beat_id, outputs)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,53 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Wall-clock breakdown of application startup.
+
+    Stages are timed with `stage(name)` (context manager, usable from any thread, so work
+    that overlaps in background threads shows up with its own start offset) or recorded
+    once with `mark(name, since=...)`. All times are relative to the profiler's creation,
+    which should happen as early as possible in the entry point.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = {}  # name -> (start offset, duration) in seconds
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end):
+        """Store a stage from two perf_counter() values."""
+        with self._lock:
+            self.stages[name] = (start - self.origin, end - start)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def mark(self, name, since=None):
+        """Record a point in time; the duration runs from `since` (perf_counter()) or from the origin."""
+        now = time.perf_counter()
+        with self._lock:
+            if name in self.stages:
+                return False  # Only the first occurrence counts (e.g. first beat)
+        self.record(name, self.origin if since is None else since, now)
+        return True
+
+    def report(self):
+        """Stages ordered by start time: {name: {"start_s": ..., "duration_s": ...}}."""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1][0])
+        return {name: {"start_s": start, "duration_s": duration} for name, (start, duration) in stages}
+
+    def format(self):
+        lines = ["Startup timing:"]
+        for name, stage in self.report().items():
+            lines.append(f"  {name:<18} +{stage['start_s'] * 1000:8.1f} ms  {stage['duration_s'] * 1000:8.1f} ms")
+        return "\n".join(lines)
+
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+class StreamingStft:
+    """Centered short-time power spectrum, computed once per hop as audio arrives.
+
+    Frames match librosa's `stft(center=True)` with a periodic Hann window: the first
+    frame is centered on sample 0 (n_fft // 2 samples of zero padding), and each call
+    transforms only the frames that became complete since the previous one.
+    """
+
+    def __init__(self, n_fft=2048, hop_length=512):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)  # Periodic Hann
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros(self.n_fft // 2, dtype=np.float32)
+        self.total_frames = 0
+
+    def process(self, samples):
+        """Consume new samples; returns the power spectra of the new frames, shape (frames, n_fft // 2 + 1)."""
+        self._pending = np.concatenate((self._pending, np.asarray(samples, dtype=np.float32)))
+        if len(self._pending) < self.n_fft:
+            return np.empty((0, self.n_fft // 2 + 1), dtype=np.float32)
+
+        frames = np.lib.stride_tricks.sliding_window_view(self._pending, self.n_fft)[::self.hop_length]
+        consumed = len(frames) * self.hop_length
+        self._pending = self._pending[consumed:].copy()
+        self.total_frames += len(frames)
+
+        return (np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2).astype(np.float32)
@@ -0,0 +1,52 @@
+from collections import deque
+import numpy as np
+
+
+class TempoTracker:
+    """Tempo and phase estimate derived from the beats reported by the beat engine.
+
+    Beat times are in stream time (seconds of captured audio). Every update also stores
+    when the audio of the reporting frame arrived (perf_counter()), which maps stream time
+    onto the monotonic clock used by the output side.
+    """
+
+    def __init__(self, history=8, max_deviation=0.08):
+        """
+        :param history: Number of recent beats used for the period estimate.
+        :param max_deviation: Relative inter-beat jitter at which the confidence drops to zero.
+        """
+        self.beats = deque(maxlen=history)
+        self.max_deviation = max_deviation
+        self.anchor = None  # (stream_time, perf_counter time) of the last reporting frame
+
+    def update(self, beat_time, stream_time, frame_time):
+        """Add a detected beat."""
+        if self.beats and beat_time <= self.beats[-1]:
+            return
+        self.beats.append(beat_time)
+        if frame_time is not None:
+            self.anchor = (stream_time, frame_time)
+
+    def reset(self):
+        self.beats.clear()
+        self.anchor = None
+
+    def estimate(self):
+        """Return the current tempo/phase estimate, or None before three beats were seen."""
+        if len(self.beats) < 3 or self.anchor is None:
+            return None
+
+        intervals = np.diff(np.fromiter(self.beats, dtype=float))
+        period = float(np.median(intervals))
+        if period <= 0:
+            return None
+        deviation = float(np.median(np.abs(intervals - period))) / period
+        stream_time, frame_time = self.anchor
+        last_beat = self.beats[-1]
+        return {
+            "period": period,
+            "bpm": 60.0 / period,
+            "last_beat": last_beat,
+            "last_beat_wall": frame_time - (stream_time - last_beat),
+            "confidence": max(0.0, 1.0 - deviation / self.max_deviation),
+        }
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+import time
+import itertools
+from collections import deque
+import numpy as np
+
+log_trace = logging.getLogger("LatencyTrace")
+
+# Pipeline stages in the order a beat passes through them
+STAGES = (
+    "capture",     # Audio block containing the beat arrived from the device
+    "madmom",      # RNN/DBN started processing the frame that produced the beat
+    "detected",    # beat_callback received the beat from madmom
+    "dispatched",  # Event handed to the asyncio loop
+    "handler",     # DMXBeatController.on_beat_detected started
+    "applied",     # Lighting step written into the Ble2Led buffers
+    "write_start", # First write_gatt_char issued after the beat
+    "write_done",  # First write_gatt_char returned
+)
+
+
+class LatencyTracer:
+    """Collects per-beat monotonic timestamps and aggregates per-stage latencies.
+
+    A beat gets a trace ID in `begin()`. Components further down the pipeline call
+    `mark(stage)`, which attributes the timestamp to the currently active beat, so no ID
+    has to be threaded through callback signatures. A trace is closed when `write_done`
+    is marked or the next beat begins. Components hold `tracer = None` when tracing is
+    disabled and skip all calls.
+    """
+
+    def __init__(self, history=10000):
+        """
+        :param history: Number of recent samples kept per stage for the percentiles.
+        """
+        self.samples = {stage: deque(maxlen=history) for stage in STAGES[1:]}
+        self.samples["total"] = deque(maxlen=history)
+        self.traces_completed = 0
+        self.active = None  # (trace_id, {stage: timestamp})
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def begin(self, **timestamps):
+        """Start a new beat trace, optionally with already known stage timestamps."""
+        trace_id = next(self._ids)
+        stamps = {stage: t for stage, t in timestamps.items() if t is not None}
+        with self._lock:
+            previous = self.active
+            self.active = (trace_id, stamps)
+        if previous:
+            self._finish(previous)
+        return trace_id
+
+    def mark(self, stage, trace_id=None):
+        """Record `stage` for the active trace (first mark of a stage wins)."""
+        active = self.active
+        if active is None or (trace_id is not None and active[0] != trace_id):
+            return
+        active[1].setdefault(stage, time.perf_counter())
+        if stage == "write_done":
+            with self._lock:
+                if self.active is active:
+                    self.active = None
+                else:
+                    return
+            self._finish(active)
+
+    def _finish(self, trace):
+        """Turn a trace's timestamps into stage-to-stage latencies."""
+        stamps = trace[1]
+        previous = None
+        for stage in STAGES:
+            if stage not in stamps:
+                continue
+            if previous is not None:
+                self.samples[stage].append(stamps[stage] - stamps[previous])
+            previous = stage
+        if len(stamps) > 1:
+            self.samples["total"].append(max(stamps.values()) - min(stamps.values()))
+        self.traces_completed += 1
+
+    def summary(self):
+        """Return {stage: {count, p50, p95, p99}} in milliseconds (latency since the previous stage)."""
+        result = {}
+        for stage, values in self.samples.items():
+            if values:
+                ms = np.fromiter(values, dtype=float) * 1000.0
+                p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+                result[stage] = {"count": len(ms), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return result
+
+    def dump(self, path):
+        """Write the current summary as JSON."""
+        with open(path, "w") as f:
+            json.dump({"traces": self.traces_completed, "stages_ms": self.summary()}, f, indent=2)
+
+    def start_periodic_dump(self, path, interval=10.0):
+        """Dump the summary to `path` every `interval` seconds from a background thread."""
+        if self._dump_thread:
+            return
+        self._dump_stop.clear()
+
+        def worker():
+            while not self._dump_stop.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    log_trace.error(f"Could not write latency trace: {e}")
+
+        self._dump_thread = threading.Thread(target=worker, daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        """Stop the periodic dump thread."""
+        if self._dump_thread:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
@@ -0,0 +1,102 @@
+import math
+import threading
+import time
+
+
+class VuMeter:
+    """Level in dB of RMS values computed elsewhere (e.g. SpectralFeatures), with attack/release smoothing.
+
+    Smoothing uses time constants, so the response does not depend on how many samples
+    each update covers (the analysis thread may batch several audio blocks).
+    """
+
+    def __init__(self, sample_rate, attack_time=0.01, release_time=0.25, floor_db=-120.0):
+        """
+        :param attack_time: Time constant in seconds for rising levels (0 = follow instantly).
+        :param release_time: Time constant in seconds for falling levels (0 = follow instantly).
+        """
+        self.sample_rate = sample_rate
+        self.attack_time = attack_time
+        self.release_time = release_time
+        self.level = floor_db
+
+    @staticmethod
+    def _coefficient(elapsed, time_constant):
+        return 1.0 if time_constant <= 0 else 1.0 - math.exp(-elapsed / time_constant)
+
+    def update_rms(self, rms, new_samples):
+        """Fold the RMS of the newest `new_samples` samples into the level; returns the smoothed dB value."""
+        db = 20 * math.log10(rms + 1e-6)
+
+        elapsed = new_samples / self.sample_rate
+        time_constant = self.attack_time if db > self.level else self.release_time
+        self.level += self._coefficient(elapsed, time_constant) * (db - self.level)
+        return self.level
+
+
+class VuChannel:
+    """Rate-limited, latest-value-wins delivery of the VU level without an event loop.
+
+    `publish()` only stores the level. One flush thread calls `callback(level)` with the
+    newest value at most `rate` times per second, so the last level before silence always
+    arrives. (With a loop, BeatDetector publishes into the EventBridge's LATEST slot
+    instead, which limits the rate on the loop.)
+    """
+
+    def __init__(self, callback, rate=30.0):
+        self.callback = callback
+        self.interval = 1.0 / rate
+        self.cond = threading.Condition()
+        self.pending = None
+        self.has_pending = False
+        self.stopped = threading.Event()
+        self.thread = None
+
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, level):
+        with self.cond:
+            self.published += 1
+            self.pending = level
+            if not self.has_pending:
+                self.has_pending = True
+                self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.has_pending and not self.stopped.is_set():
+                    self.cond.wait()
+                if self.stopped.is_set():
+                    return
+                level = self.pending
+                self.has_pending = False
+                self.delivered += 1
+            self.callback(level)
+            if self.stopped.wait(self.interval):
+                return
+
+    def start(self):
+        """Start the flush thread."""
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="VuChannel", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the flush thread; a value still held back is discarded."""
+        if self.thread is not None:
+            with self.cond:
+                self.stopped.set()
+                self.cond.notify()
+            self.thread.join()
+            self.thread = None
+
+    def getStats(self):
+        """Published values versus values handed to the callback."""
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.published - self.delivered - self.has_pending,
+        }
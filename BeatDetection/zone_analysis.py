@@ -0,0 +1,206 @@
+import os
+import queue
+import threading
+import logging
+import multiprocessing as mp
+from .capture import ChannelFanout
+from .event_bridge import EventBridge, KEEP, LATEST
+from .ring_buffer import SharedAudioRing
+
+log_zones = logging.getLogger("ZoneAnalysis")
+
+
+def _worker_main(name, capture_options, engine, detector_options, cpu_affinity, events, stop_event):
+    """Entry point of a zone's analysis process: one capture and one BeatDetector."""
+    from .BeatDetector import BeatDetector, LOG_FORMAT
+    from .capture import SharedRingCapture
+    from .startup import StartupProfiler
+
+    logging.basicConfig(format=f"[{name}] {LOG_FORMAT}", level=logging.INFO)
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_affinity)
+
+    profiler = StartupProfiler()
+    capture_options = dict(capture_options)
+    input_file = capture_options.pop("input_file", None)
+    if input_file:
+        from .replay import ReplayCapture
+        capture = ReplayCapture.from_file(input_file, realtime=True, **capture_options)
+    else:
+        capture = SharedRingCapture(**capture_options)  # Fed by the pool's capture of the zone's device
+
+    # Without a loop the detector calls both callbacks from its own threads (VU already rate limited)
+    detector = BeatDetector(callback=lambda is_beat: events.put(("beat", name, is_beat)),
+                            vuCallback=lambda level: events.put(("vu", name, level)),
+                            capture=capture, engine=engine, profiler=profiler, **detector_options)
+    detector.run()
+    events.put(("ready", name, profiler.report()))
+
+    stop_event.wait()
+    detector.stop()
+    events.put(("stopped", name, detector.get_batch_stats(), detector.engine.cpu_stats(),
+                getattr(capture, "samples_dropped", 0)))
+
+
+class _ZoneWorker:
+    def __init__(self, name, capture_options, engine, detector_options, cpu_affinity):
+        self.name = name
+        self.capture_options = capture_options
+        self.args = (engine, detector_options, cpu_affinity)
+        self.ring = None  # SharedAudioRing carrying the zone's channel (live input only)
+        self.data_ready = None
+        self.process = None
+        self.stop_event = None
+        self.ready = None  # Startup report of the worker's detector
+        self.stats = None  # Batch and engine CPU stats, sent when the worker stops
+
+
+class ZoneAnalysisPool:
+    """Runs the audio analysis of every zone in its own worker process.
+
+    Each zone gets a spawned process running a `BeatDetector`, so zones scale across
+    cores and a slow engine in one room cannot delay another. Input devices are opened
+    once, in this process: a `ChannelFanout` per device writes every zone's channel into
+    that zone's `SharedAudioRing`, so zones may share a multi-channel interface. The
+    workers send beats and VU levels through one multiprocessing queue; a receiver
+    thread hands them to an `EventBridge`, which calls `on_beat(is_beat)` and
+    `on_vu(level)` of the zone on the loop (beats are never dropped, VU keeps only the
+    latest level per zone). BLE output stays in the process that owns the loop.
+    """
+
+    def __init__(self, loop, sample_rate=44100, ring_seconds=2.0):
+        """
+        :param ring_seconds: Capacity of each zone's shared audio ring.
+        """
+        self.loop = loop
+        self.sample_rate = sample_rate
+        self.ring_capacity = int(ring_seconds * sample_rate)
+        self.ctx = mp.get_context("spawn")
+        self.events = self.ctx.Queue()
+        self.bridge = EventBridge(loop)
+        self.workers = {}
+        self.captures = []  # One ChannelFanout per input device
+        self.receiver = None
+
+    def add(self, name, on_beat, on_vu=None, input_device=None, channel=0, channels=1, input_file=None,
+            engine="madmom", cpu_affinity=None, **detector_options):
+        """Register a zone.
+
+        :param input_device: sounddevice input of the zone (default: the system input).
+        :param channel: Channel of `input_device` analysed for this zone.
+        :param channels: Channels to open on `input_device` (zones sharing it open the maximum).
+        :param input_file: Replay this audio file in real time instead of capturing (for testing).
+        :param engine: Beat engine name passed to BeatDetector ("madmom" or "flux").
+        :param cpu_affinity: CPU ids the zone's process is pinned to.
+        :param detector_options: Further BeatDetector keyword arguments (must be picklable).
+        """
+        if name in self.workers:
+            raise ValueError(f"Duplicate zone name: {name}")
+        if input_file:
+            capture_options = {"input_file": input_file}
+        else:
+            capture_options = {"device": input_device, "channel": channel, "channels": channels}
+        self.workers[name] = _ZoneWorker(name, capture_options, engine, detector_options, cpu_affinity)
+        self.bridge.register(f"{name}:beat", on_beat, policy=KEEP)
+        if on_vu:
+            self.bridge.register(f"{name}:vu", on_vu, policy=LATEST)
+
+    def _open_captures(self):
+        """Create one ChannelFanout per input device and a ring per live zone."""
+        devices = {}  # input_device -> zones using it
+        for worker in self.workers.values():
+            if "input_file" not in worker.capture_options:
+                devices.setdefault(worker.capture_options["device"], []).append(worker)
+
+        for device, workers in devices.items():
+            channels = max(max(w.capture_options["channels"], w.capture_options["channel"] + 1) for w in workers)
+            capture = ChannelFanout(self.sample_rate, channels=channels, device=device)
+            for worker in workers:
+                worker.ring = SharedAudioRing(self.ring_capacity)
+                worker.data_ready = self.ctx.Event()
+                capture.subscribe_channel(worker.capture_options["channel"], self._ring_writer(worker))
+            self.captures.append(capture)
+
+    @staticmethod
+    def _ring_writer(worker):
+        def write(block, sample_index):
+            worker.ring.write(block)
+            worker.data_ready.set()
+        return write
+
+    def _worker_capture_options(self, worker):
+        if worker.ring is None:
+            return worker.capture_options
+        return {"ring_name": worker.ring.name, "capacity": self.ring_capacity, "data_ready": worker.data_ready,
+                "sample_rate": self.sample_rate}
+
+    def start(self):
+        """Spawn one process per zone, open the input devices and start delivering events."""
+        self._open_captures()
+        for worker in self.workers.values():
+            worker.stop_event = self.ctx.Event()
+            worker.process = self.ctx.Process(
+                target=_worker_main, name=f"Zone-{worker.name}", daemon=True,
+                args=(worker.name, self._worker_capture_options(worker)) + worker.args
+                + (self.events, worker.stop_event))
+            worker.process.start()
+            log_zones.info(f"Zone {worker.name} analysis started (pid {worker.process.pid}).")
+        for capture in self.captures:
+            capture.start()
+        self.bridge.start()
+        self.receiver = threading.Thread(target=self._receive, daemon=True)
+        self.receiver.start()
+
+    def _receive(self):
+        running = set(self.workers)
+        while running:
+            try:
+                event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                for name in list(running):
+                    if not self.workers[name].process.is_alive():
+                        log_zones.error(f"Zone {name} analysis process exited unexpectedly.")
+                        running.discard(name)
+                continue
+
+            kind, name = event[0], event[1]
+            if kind == "beat":
+                self.bridge.publish(f"{name}:beat", event[2])
+            elif kind == "vu":
+                if f"{name}:vu" in self.bridge.handlers:
+                    self.bridge.publish(f"{name}:vu", event[2])
+            elif kind == "ready":
+                self.workers[name].ready = event[2]
+                log_zones.info(f"Zone {name} ready.")
+            elif kind == "stopped":
+                self.workers[name].stats = {"batch": event[2], "engine_cpu": event[3], "samples_dropped": event[4]}
+                running.discard(name)
+
+    def stop(self, timeout=5.0):
+        """Stop all workers (blocking; run it in an executor from the loop)."""
+        for capture in self.captures:
+            capture.stop()
+        self.captures = []
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.stop_event.set()
+        if self.receiver:
+            self.receiver.join(timeout)
+            self.receiver = None
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                worker.process = None
+            if worker.ring is not None:
+                worker.ring.close()
+                worker.ring.unlink()
+                worker.ring = None
+        self.bridge.stop()
+
+    def getStats(self):
+        """Per zone: startup report and final analysis stats, plus the event bridge counters."""
+        stats = {name: {"ready": worker.ready, "stats": worker.stats} for name, worker in self.workers.items()}
+        stats["events"] = self.bridge.getStats()
+        return stats
@@ -1,8 +1,13 @@
+from contextlib import contextmanager
 from .ble2led import Ble2Led
 from .led_interface import LEDInterface
 
 class b2lSingle(LEDInterface):
-    """Represents a single LED channel (CH1 or CH2) of a Ble2Led device."""
+    """Represents a single LED channel (CH1 or CH2) of a Ble2Led device.
+
+    Multi-channel setters (setRGB, setState) and setters inside `with fixture.batch():`
+    reach the device as one range update: validated once, one slice write, one dirty mark.
+    """
 
     def __init__(self, ble2led: Ble2Led, ch: int):
         if ch not in [0, 1]:
@@ -10,38 +15,63 @@ class b2lSingle(LEDInterface):
 
         self.ble2led = ble2led
         self.channel_offset = ch * 5  # CH1 = 0-4, CH2 = 5-9
+        self._staged = None  # Channel values collected by an open batch()
+
+    def _write(self, offset, values):
+        if self._staged is not None:
+            self._staged[offset:offset + len(values)] = values
+        else:
+            self.ble2led.updateDmxRange(self.channel_offset + offset, values)
+
+    @contextmanager
+    def batch(self):
+        """Collect setter calls and send them as one update when the block exits without error."""
+        if self._staged is not None:
+            yield self  # Nested batch: the outer one writes
+            return
+        self._staged = list(self.ble2led.getDmx()[self.channel_offset:self.channel_offset + 5])
+        try:
+            yield self
+            staged = self._staged
+        finally:
+            self._staged = None
+        self.ble2led.updateDmxRange(self.channel_offset, staged)
 
     def setR(self, value):
-        self.ble2led.updateDmx(self.channel_offset + 0, value)
+        self._write(0, (value,))
 
     def getR(self):
         return self.ble2led.getDmx(self.channel_offset + 0)
 
     def setG(self, value):
-        self.ble2led.updateDmx(self.channel_offset + 1, value)
+        self._write(1, (value,))
 
     def getG(self):
         return self.ble2led.getDmx(self.channel_offset + 1)
 
     def setB(self, value):
-        self.ble2led.updateDmx(self.channel_offset + 2, value)
+        self._write(2, (value,))
 
     def getB(self):
         return self.ble2led.getDmx(self.channel_offset + 2)
 
     def setDim(self, value):
-        self.ble2led.updateDmx(self.channel_offset + 3, value)
+        self._write(3, (value,))
 
     def getDim(self):
         return self.ble2led.getDmx(self.channel_offset + 3)
     
     def setStrobe(self, value):
-        self.ble2led.updateDmx(self.channel_offset + 4, value)
+        self._write(4, (value,))
 
     def getSTrobe(self):
         return self.ble2led.getDmx(self.channel_offset + 4)
 
     def setRGB(self, r, g, b):
-        self.setR(r)
-        self.setG(g)
-        self.setB(b)
+        self._write(0, (r, g, b))
+
+    def setState(self, r, g, b, dim, strobe):
+        if self._staged is not None:
+            self._staged[:] = (r, g, b, dim, strobe)
+        else:
+            self.ble2led.updateDmxRange(self.channel_offset, (r, g, b, dim, strobe))
@@ -1,25 +1,88 @@
 import asyncio
 import logging
+import time
 from .ble_device import BLEDevice
+from .dmx_protocol import DMX_CAPS_CHAR_UUID, CAP_ALL, encode
 
 log = logging.getLogger("Ble2Led")
 
 DMX_SERVICE_UUID = "0000C001-0000-1000-8000-00805F9B34FB"
 DMX_RX_CHAR_UUID = "0000C002-0000-1000-8000-00805F9B34FB"
 
+CONN_INTERVAL = 0.0075  # BLE connection interval requested by the firmware (7.5 ms)
+
 class Ble2Led(BLEDevice):
-    """Manages a BLE LED device with optimized DMX transmission and smart batching."""
+    """Manages a BLE LED device with optimized DMX transmission and smart batching.
+
+    Channel updates only touch the local buffer; a per-device flush loop started on
+    connect() sends at most one coalesced packet per frame, on a fixed grid of
+    `intervals_per_frame` BLE connection intervals. Packets use the compact formats of
+    `dmx_protocol` when the firmware supports them and the legacy prefix format otherwise.
+    """
 
-    def __init__(self, address, name):
+    def __init__(self, address, name, conn_interval=CONN_INTERVAL, intervals_per_frame=2, packet_format="auto"):
+        """
+        :param packet_format: "auto" negotiates compact packets on connect, "prefix" always sends the legacy format.
+        """
         super().__init__(address, name)
         self.data = bytearray(10)  # 10-channel DMX buffer
-        self.highest_changed_index = -1  # Track highest changed index
+        self.changed_mask = 0  # Bit i set = channel i changed since the last write
+        self.packet_format = packet_format
+        self.caps = 0  # Negotiated compact formats (dmx_protocol.CAP_*); 0 = prefix format
         self.dirty_flag = False  # Track if updates are pending
-        self.debounce_task = None  # Track debounce task
-        self.debounce_delay = 0.002  # 2ms debounce
+        self.frame_interval = conn_interval * intervals_per_frame  # Seconds between flush ticks
+        self.flush_task = None
+        self.auto_flush = True  # False when a Ble2LedGroup commits frames for this device
+        self.tracer = None  # Optional LatencyTracer, set by the application
+        self.output_latency = None  # Smoothed seconds from first change to completed write
+        self._dirty_since = None
+        self.updates = 0  # Accepted changes (a range update counts once)
+        self.writes = 0  # Packets sent
+        self.bytes_sent = 0  # Payload bytes sent
+
+    async def connect(self):
+        """Connect and start the frame flush loop."""
+        await super().connect()
+        await self.negotiate_format()
+        if self.auto_flush:
+            self.start_flush_loop()
+
+    async def disconnect(self):
+        """Stop the flush loop (sending pending changes first) and disconnect."""
+        await self.stop_flush_loop()
+        await super().disconnect()
+
+    async def negotiate_format(self):
+        """Enable the compact packet formats if the firmware offers them, else keep the prefix format."""
+        self.caps = 0
+        if self.packet_format == "prefix":
+            return
+        try:
+            caps = (await self.client.read_gatt_char(DMX_CAPS_CHAR_UUID))[0] & CAP_ALL
+            if caps:
+                await self.client.write_gatt_char(DMX_CAPS_CHAR_UUID, bytes((caps,)), response=True)
+        except Exception as e:
+            log.info(f"{self.name}: no compact packet support ({e}), using the prefix format.")
+            return
+        self.caps = caps
+
+    def start_flush_loop(self):
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop_flush_loop(self):
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+            if self.dirty_flag:
+                await self._write_frame()
 
     def updateDmx(self, index, value):
-        """Update a DMX channel and ensure changes are batched into a single transmission."""
+        """Update a DMX channel; the next flush tick sends all pending changes together."""
         if not (0 <= index < 10):
             raise ValueError("DMX index must be between 0-9.")
 
@@ -28,14 +91,40 @@ class Ble2Led(BLEDevice):
 
         if self.data[index] != value:
             self.data[index] = value
-            self.highest_changed_index = max(self.highest_changed_index, index)
-            self.dirty_flag = True  # Mark that changes are pending
+            self.changed_mask |= 1 << index
+            if not self.dirty_flag:
+                self._dirty_since = time.perf_counter()
+                self.dirty_flag = True  # Mark that changes are pending
+            self.updates += 1
 
-            # Restart the debounce timer (cancel old task if running)
-            if self.debounce_task:
-                self.debounce_task.cancel()
+    def updateDmxRange(self, start, values):
+        """Update consecutive DMX channels from `start` with one validation and one dirty mark."""
+        try:
+            # Element-wise: bytes() of an ndarray would copy its raw memory, not its values
+            values = values if isinstance(values, bytes) else bytes(list(values))
+        except (ValueError, TypeError):
+            raise ValueError("DMX values must be between 0-255.") from None
+        end = start + len(values)
+        if not (0 <= start and end <= len(self.data)):
+            raise ValueError("DMX range must lie within channels 0-9.")
+
+        current = self.data[start:end]
+        if current != values:
+            for i in range(len(values)):
+                if current[i] != values[i]:
+                    self.changed_mask |= 1 << (start + i)
+            self.data[start:end] = values
+            if not self.dirty_flag:
+                self._dirty_since = time.perf_counter()
+                self.dirty_flag = True
+            self.updates += 1
 
-            self.debounce_task = asyncio.create_task(self._debounce_write())
+    def invalidate(self):
+        """Mark every channel for resending, e.g. after a reconnect."""
+        self.changed_mask = (1 << len(self.data)) - 1
+        if not self.dirty_flag:
+            self._dirty_since = time.perf_counter()
+            self.dirty_flag = True
 
     def getDmx(self, index=None):
         """Get the DMX state (either all channels or a single one)."""
@@ -46,21 +135,62 @@ class Ble2Led(BLEDevice):
         else:
             raise ValueError("DMX index must be between 0-9.")
 
-    async def _debounce_write(self):
-        """Waits briefly to batch multiple updates into a single BLE write."""
-        try:
-            await asyncio.sleep(self.debounce_delay)  # Wait for more changes
+    def getStats(self):
+        """Return update/write counters; a high ratio means many changes were coalesced."""
+        return {
+            "updates": self.updates,
+            "writes": self.writes,
+            "bytes_sent": self.bytes_sent,
+            "update_to_write_ratio": self.updates / self.writes if self.writes else 0.0,
+        }
 
-            if self.client and self.client.is_connected and self.dirty_flag and self.highest_changed_index >= 0:
-                packet = self.data[: self.highest_changed_index + 1]
-                await self.client.write_gatt_char(DMX_RX_CHAR_UUID, packet, response=False)
-                log.debug(f"Sent: {list(packet)}")
+    def _update_output_latency(self, dirty_since):
+        """Fold the latency of the write that just completed into the running average."""
+        if dirty_since is not None:
+            sample = time.perf_counter() - dirty_since
+            self.output_latency = sample if self.output_latency is None else 0.9 * self.output_latency + 0.1 * sample
 
-                # Reset tracking variables
-                self.highest_changed_index = -1
-                self.dirty_flag = False
-                self.debounce_task = None  # Allow new debounce task to start
+    async def _flush_loop(self):
+        """Tick on a fixed grid and send one packet per tick when something changed."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.frame_interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Fell behind; don't burst to catch up
 
-        except asyncio.CancelledError:
-            # If the task was cancelled, do nothing (new update will trigger another debounce)
-            pass
+            if self.dirty_flag:
+                try:
+                    await self._write_frame()
+                except Exception as e:
+                    log.error(f"Write to {self.name} failed: {e}")
+
+    async def _write_frame(self):
+        """Send the changed channels of the DMX buffer as one packet."""
+        if self.client and self.client.is_connected and self.dirty_flag and self.changed_mask:
+            mask = self.changed_mask
+            packet = encode(self.data, mask, self.caps)
+            dirty_since = self._dirty_since
+
+            # Reset tracking before awaiting, so changes made during the write go out next tick
+            self.changed_mask = 0
+            self.dirty_flag = False
+
+            if self.tracer:
+                self.tracer.mark("write_start")
+            try:
+                await self.client.write_gatt_char(DMX_RX_CHAR_UUID, packet, response=False)
+            except BaseException:
+                # Not sent: mark the channels dirty again so a later frame carries them
+                self.changed_mask |= mask
+                self.dirty_flag = True
+                raise
+            if self.tracer:
+                self.tracer.mark("write_done")
+            self.writes += 1
+            self.bytes_sent += len(packet)
+            self._update_output_latency(dirty_since)
+            log.debug(f"Sent: {list(packet)}")
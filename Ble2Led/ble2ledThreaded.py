@@ -1,8 +1,10 @@
 import asyncio
 import logging
+import time
 import threading
-import queue
+from collections import deque
 from .ble_device import BLEDevice
+from .dmx_protocol import DMX_CAPS_CHAR_UUID, CAP_ALL, encode
 
 log = logging.getLogger("Ble2Led")
 
@@ -10,22 +12,92 @@ DMX_SERVICE_UUID = "0000C001-0000-1000-8000-00805F9B34FB"
 DMX_RX_CHAR_UUID = "0000C002-0000-1000-8000-00805F9B34FB"
 
 class Ble2Led(BLEDevice):
-    """Manages a BLE LED device with optimized DMX transmission and smart batching."""
+    """Manages a BLE LED device with optimized DMX transmission and smart batching.
 
-    def __init__(self, address, name):
+    All BLE traffic (connect, writes, disconnect) runs on one long-lived event loop owned
+    by a worker thread, so the BleakClient is always used on the loop it was created on.
+    Updates from any thread only mark the buffer dirty; pending wakeups are collapsed
+    into a single write. Packets use the compact formats of `dmx_protocol` when the
+    firmware supports them and the legacy prefix format otherwise.
+    """
+
+    def __init__(self, address, name, packet_format="auto"):
+        """
+        :param packet_format: "auto" negotiates compact packets on connect, "prefix" always sends the legacy format.
+        """
         super().__init__(address, name)
         self.data = bytearray(10)  # 10-channel DMX buffer
-        self.highest_changed_index = -1  # Track highest changed index
+        self.changed_mask = 0  # Bit i set = channel i changed since the last write
+        self.packet_format = packet_format
+        self.caps = 0  # Negotiated compact formats (dmx_protocol.CAP_*); 0 = prefix format
         self.dirty_flag = False  # Track if updates are pending
         self.debounce_delay = 0.002  # 2ms debounce
+        self.tracer = None  # Optional LatencyTracer, set by the application
+        self.output_latency = None  # Smoothed seconds from first change to completed write
+        self._dirty_since = None
+        self.lock = threading.Lock()  # Guards the buffer and dirty tracking across threads
+
+        # Metrics
+        self.updates = 0
+        self.writes = 0
+        self.bytes_sent = 0
+        self.pending_updates = 0  # Updates waiting for the next write (queue depth; a range update counts once)
+        self.max_pending_updates = 0
+        self.write_times = deque(maxlen=100)
 
-        # Threaded BLE Write System
-        self.ble_queue = queue.Queue()
+        # Threaded BLE Write System: one persistent loop for the device's lifetime
+        self.loop = asyncio.new_event_loop()
+        self._wakeup = asyncio.Event()  # Binds to self.loop on first use in the worker
+        self._wakeup_scheduled = False
+        self._writer_task = None
         self.ble_thread = threading.Thread(target=self._ble_worker, daemon=True)
         self.ble_thread.start()
 
+    def _run_on_loop(self, coro):
+        """Run a coroutine on the BLE loop and wait for it from the caller's loop."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def connect(self):
+        """Connect to the BLE device on the worker loop and negotiate the packet format."""
+        await self._run_on_loop(super().connect())
+        await self._run_on_loop(self._negotiate_format())
+
+    async def disconnect(self):
+        """Disconnect from the BLE device on the worker loop."""
+        await self._run_on_loop(super().disconnect())
+
+    async def getRssi(self):
+        """Retrieve RSSI value on the worker loop."""
+        return await self._run_on_loop(super().getRssi())
+
+    async def _negotiate_format(self):
+        """Enable the compact packet formats if the firmware offers them, else keep the prefix format."""
+        self.caps = 0
+        if self.packet_format == "prefix":
+            return
+        try:
+            caps = (await self.client.read_gatt_char(DMX_CAPS_CHAR_UUID))[0] & CAP_ALL
+            if caps:
+                await self.client.write_gatt_char(DMX_CAPS_CHAR_UUID, bytes((caps,)), response=True)
+        except Exception as e:
+            log.info(f"{self.name}: no compact packet support ({e}), using the prefix format.")
+            return
+        self.caps = caps
+
+    def shutdown(self):
+        """Stop the worker loop and thread."""
+        def stop():
+            if self._writer_task is None:
+                self.loop.stop()
+                return
+            self._writer_task.add_done_callback(lambda task: self.loop.stop())
+            self._writer_task.cancel()
+        self.loop.call_soon_threadsafe(stop)
+        self.ble_thread.join()
+        self.loop.close()
+
     def updateDmx(self, index, value):
-        """Update a DMX channel and queue BLE writes in a separate thread."""
+        """Update a DMX channel and wake the BLE worker (at most one pending wakeup)."""
         if not (0 <= index < 10):
             raise ValueError("DMX index must be between 0-9.")
 
@@ -33,12 +105,62 @@ class Ble2Led(BLEDevice):
             raise ValueError("DMX values must be between 0-255.")
 
         if self.data[index] != value:
-            self.data[index] = value
-            self.highest_changed_index = max(self.highest_changed_index, index)
-            self.dirty_flag = True  # Mark changes as pending
+            with self.lock:
+                self.data[index] = value
+                self.changed_mask |= 1 << index
+                if not self.dirty_flag:
+                    self._dirty_since = time.perf_counter()
+                self.dirty_flag = True  # Mark changes as pending
+                self.updates += 1
+                self.pending_updates += 1
+                wake = not self._wakeup_scheduled
+                self._wakeup_scheduled = True
+
+            if wake:
+                self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def updateDmxRange(self, start, values):
+        """Update consecutive DMX channels from `start` with one validation and one wakeup."""
+        try:
+            # Element-wise: bytes() of an ndarray would copy its raw memory, not its values
+            values = values if isinstance(values, bytes) else bytes(list(values))
+        except (ValueError, TypeError):
+            raise ValueError("DMX values must be between 0-255.") from None
+        end = start + len(values)
+        if not (0 <= start and end <= len(self.data)):
+            raise ValueError("DMX range must lie within channels 0-9.")
 
-            # Queue the update (debounce + write in worker thread)
-            self.ble_queue.put(None)
+        with self.lock:
+            current = self.data[start:end]
+            if current == values:
+                return
+            for i in range(len(values)):
+                if current[i] != values[i]:
+                    self.changed_mask |= 1 << (start + i)
+            self.data[start:end] = values
+            if not self.dirty_flag:
+                self._dirty_since = time.perf_counter()
+            self.dirty_flag = True
+            self.updates += 1
+            self.pending_updates += 1
+            wake = not self._wakeup_scheduled
+            self._wakeup_scheduled = True
+
+        if wake:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def invalidate(self):
+        """Mark every channel for resending, e.g. after a reconnect."""
+        with self.lock:
+            self.changed_mask = (1 << len(self.data)) - 1
+            if not self.dirty_flag:
+                self._dirty_since = time.perf_counter()
+            self.dirty_flag = True
+            wake = not self._wakeup_scheduled
+            self._wakeup_scheduled = True
+
+        if wake:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
 
     def getDmx(self, index=None):
         """Get the DMX state (either all channels or a single one)."""
@@ -49,24 +171,74 @@ class Ble2Led(BLEDevice):
         else:
             raise ValueError("DMX index must be between 0-9.")
 
+    def getStats(self):
+        """Return update/write counters, queue depth and the recent write rate."""
+        rate = 0.0
+        if len(self.write_times) > 1:
+            span = self.write_times[-1] - self.write_times[0]
+            rate = (len(self.write_times) - 1) / span if span > 0 else 0.0
+        return {
+            "updates": self.updates,
+            "writes": self.writes,
+            "bytes_sent": self.bytes_sent,
+            "queue_depth": self.pending_updates,
+            "max_queue_depth": self.max_pending_updates,
+            "writes_per_second": rate,
+        }
+
+    def _update_output_latency(self, dirty_since):
+        """Fold the latency of the write that just completed into the running average."""
+        if dirty_since is not None:
+            sample = time.perf_counter() - dirty_since
+            self.output_latency = sample if self.output_latency is None else 0.9 * self.output_latency + 0.1 * sample
+
     def _ble_worker(self):
-        """Worker thread that processes BLE writes in the background."""
+        """Worker thread that owns the BLE event loop."""
+        asyncio.set_event_loop(self.loop)
+        self._writer_task = self.loop.create_task(self._writer())
+        self.loop.run_forever()
+
+    async def _writer(self):
+        """Wait for wakeups and turn every burst of updates into one write."""
         while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.debounce_delay)  # Wait for more changes
+            with self.lock:
+                self._wakeup_scheduled = False
+                self.max_pending_updates = max(self.max_pending_updates, self.pending_updates)
+                self.pending_updates = 0
             try:
-                self.ble_queue.get()  # Wait for update request
-                asyncio.run(self._debounce_write())  # Run async BLE write in thread
+                await self._debounce_write()
             except Exception as e:
                 log.error(f"BLE Worker Error: {e}")
 
     async def _debounce_write(self):
-        """Wait briefly to batch multiple updates into a single BLE write."""
-        await asyncio.sleep(self.debounce_delay)  # Wait for more changes
+        """Send the changed channels of the DMX buffer as one packet."""
+        if self.client and self.client.is_connected and self.dirty_flag and self.changed_mask:
+            with self.lock:
+                mask = self.changed_mask
+                packet = encode(self.data, mask, self.caps)
+                dirty_since = self._dirty_since
 
-        if self.client and self.client.is_connected and self.dirty_flag and self.highest_changed_index >= 0:
-            packet = self.data[: self.highest_changed_index + 1]
-            await self.client.write_gatt_char(DMX_RX_CHAR_UUID, packet, response=False)
-            log.debug(f"Sent: {list(packet)}")
+                # Reset tracking before awaiting, so changes made during the write go out next time
+                self.changed_mask = 0
+                self.dirty_flag = False
 
-            # Reset tracking variables
-            self.highest_changed_index = -1
-            self.dirty_flag = False
+            if self.tracer:
+                self.tracer.mark("write_start")
+            try:
+                await self.client.write_gatt_char(DMX_RX_CHAR_UUID, packet, response=False)
+            except BaseException:
+                # Not sent: mark the channels dirty again so a later write carries them
+                with self.lock:
+                    self.changed_mask |= mask
+                    self.dirty_flag = True
+                raise
+            if self.tracer:
+                self.tracer.mark("write_done")
+            self._update_output_latency(dirty_since)
+            self.writes += 1
+            self.bytes_sent += len(packet)
+            self.write_times.append(time.perf_counter())
+            log.debug(f"Sent: {list(packet)}")
@@ -1,19 +1,62 @@
 import asyncio
+import json
 import logging
+import os
+import time
 from bleak import BleakScanner
 from .ble2led import Ble2Led
 
 # Logging
-logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("DMXController")
 
 DEVICE_FILTER = ["b2l", "b2s"]
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".sound2ble_devices.json")
+DEFAULT_PARALLELISM = 4
+MAX_CACHE_FAILURES = 3  # Runs a cached device may be missing (not connected, not advertising) before it is dropped
+
+def is_fixture(name):
+    """True for advertised names of Ble2Led fixtures."""
+    return any(filter_name in (name or "") for filter_name in DEVICE_FILTER)
+
 
 class BleController:
-    """Manages DMX Devices and provides hardware abstraction."""
+    """Manages DMX Devices and provides hardware abstraction.
+
+    Addresses of found devices are kept in a JSON cache (name -> address), so later runs
+    can connect to known fixtures directly while a bounded scan looks for new ones. Cached
+    devices that are neither reachable nor advertising for MAX_CACHE_FAILURES runs in a row
+    are dropped from the cache.
+    """
 
-    def __init__(self):
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE):
+        """
+        :param cache_file: Path of the persisted device cache; None disables persistence.
+        """
         self.devices = {}
+        self.failures = {}  # name -> consecutive runs the cached device was missing
+        self.cache_file = cache_file
+        self.loadCache()
+
+    def loadCache(self):
+        """Merge the persisted name -> address cache into the known devices."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                cache = json.load(f)
+            self.devices.update(cache["devices"])
+            self.failures.update(cache.get("failures", {}))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning(f"Ignoring unreadable device cache {self.cache_file}: {e}")
+
+    def saveCache(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump({"devices": self.devices, "failures": self.failures}, f, indent=2)
+        except OSError as e:
+            log.warning(f"Could not write device cache {self.cache_file}: {e}")
 
     async def findDevices(self):
         """Scan for DMX devices and return matching names."""
@@ -22,14 +65,166 @@ class BleController:
         devices = await BleakScanner.discover()
 
         for device in devices:
-            if any(filter_name in (device.name or "") for filter_name in DEVICE_FILTER):
+            if is_fixture(device.name):
                 found_devices.append(device.name)
                 self.devices[device.name] = device.address
 
+        self.saveCache()
         return found_devices
 
+    async def _scan(self, timeout, on_found, stop=None):
+        """Scan for up to `timeout` seconds (less once `stop` is set).
+
+        `on_found(name)` is called for advertising devices until it accepts them. Devices it accepts (returns
+        True) or whose name matches DEVICE_FILTER are stored with their current address.
+        """
+        reported = set()
+
+        def on_detection(device, advertisement_data):
+            name = device.name or advertisement_data.local_name
+            if not name or name in reported:
+                return
+            if on_found(name) or is_fixture(name):
+                reported.add(name)
+                self.devices[name] = device.address
+
+        stop = stop or asyncio.Event()
+        async with BleakScanner(detection_callback=on_detection):
+            try:
+                await asyncio.wait_for(stop.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return reported
+
+    async def scanFor(self, names, timeout=5.0):
+        """Scan until all `names` were seen or `timeout` expires; returns the names found."""
+        wanted = set(names)
+        found = []
+        done = asyncio.Event()
+
+        def on_found(name):
+            if name not in wanted:
+                return False
+            wanted.discard(name)
+            found.append(name)
+            if not wanted:
+                done.set()
+            return True
+
+        log.info(f"Scanning for {', '.join(sorted(wanted))}...")
+        await self._scan(timeout, on_found, done)
+        self.saveCache()
+        return found
+
     def getDevice(self, deviceName):
         """Returns a `Ble2Led` instance if the device exists."""
         if deviceName not in self.devices:
             raise ValueError("Device not found. Run findDevices() first.")
         return Ble2Led(self.devices[deviceName], deviceName)
+
+    async def connectAll(self, names=None, parallelism=DEFAULT_PARALLELISM, scan_timeout=5.0, setup=None):
+        """Connect to several devices concurrently.
+
+        Cached devices are connected directly while a discovery scan of at most
+        `scan_timeout` seconds runs alongside. Devices the scan finds that are not cached
+        are connected as soon as they are seen. A cached device whose connect fails is
+        retried once, on the same Ble2Led instance, when the scan sees it advertising.
+        With `names` given, the scan ends as soon as all of them are connected.
+
+        :param names: Device names (default: every cached device plus every device found).
+        :param parallelism: Maximum number of connects in flight.
+        :param setup: Called with each Ble2Led once it is connected (e.g. to add it to a group).
+        :return: (connected Ble2Led list sorted by name, report dict).
+        """
+        start = time.perf_counter()
+        cached = set(self.devices)
+        wanted = None if names is None else set(names)
+        known = sorted(name for name in cached if wanted is None or name in wanted)
+        semaphore = asyncio.Semaphore(parallelism)
+        scan_done = asyncio.Event()
+        all_connected = asyncio.Event()
+        sightings = {}  # name -> Event set when the scan sees the device
+        instances = {}
+        tasks = []
+        connected = {}
+        connect_times = {}
+
+        async def wait_for_sighting(name):
+            seen = asyncio.ensure_future(sightings.setdefault(name, asyncio.Event()).wait())
+            done = asyncio.ensure_future(scan_done.wait())
+            await asyncio.wait((seen, done), return_when=asyncio.FIRST_COMPLETED)
+            seen.cancel()
+            done.cancel()
+            return sightings[name].is_set()
+
+        async def connect(name, retry):
+            device = instances.get(name)
+            if device is None:
+                device = instances[name] = self.getDevice(name)
+            device.address = self.devices[name]  # The scan may have reported a new address
+            async with semaphore:
+                try:
+                    await device.connect()
+                except Exception as e:
+                    log.info(f"Connecting to {name} failed: {e}")
+                    device = None
+            if device is None:
+                if retry and await wait_for_sighting(name):
+                    await connect(name, retry=False)
+                return
+            if setup:
+                setup(device)
+            connected[name] = device
+            connect_times[name] = time.perf_counter() - start
+            if wanted is not None and wanted <= set(connected):
+                all_connected.set()
+
+        def on_found(name):
+            if (name not in wanted) if wanted is not None else not is_fixture(name):
+                return False
+            sightings.setdefault(name, asyncio.Event()).set()
+            if name not in cached and name not in instances:
+                instances[name] = None
+                tasks.append(asyncio.ensure_future(connect(name, retry=False)))  # Runs once the address is stored
+            return True
+
+        tasks.extend(asyncio.ensure_future(connect(name, retry=True)) for name in known)
+        if wanted is not None and wanted <= set(connected):
+            all_connected.set()
+        try:
+            await self._scan(scan_timeout, on_found, all_connected if wanted is not None else None)
+        finally:
+            scan_done.set()
+        while tasks:
+            pending = list(tasks)
+            tasks.clear()
+            await asyncio.gather(*pending)
+
+        seen = {name for name, event in sightings.items() if event.is_set()}
+        names = sorted(wanted) if wanted is not None else sorted(set(known) | seen)
+        failed = [name for name in names if name not in connected]
+        stale = [name for name in failed if name in cached and name not in seen]
+        for name in names:
+            if name in connected:
+                self.failures.pop(name, None)
+            elif name in stale:
+                self.failures[name] = self.failures.get(name, 0) + 1
+                if self.failures[name] >= MAX_CACHE_FAILURES:
+                    log.info(f"Dropping {name} from the device cache (missing for {self.failures[name]} runs).")
+                    del self.devices[name]
+                    del self.failures[name]
+        self.saveCache()
+
+        report = {
+            "connected": len(connected),
+            "failed": failed,
+            "stale": stale,  # Cached, but neither reachable nor advertising
+            "from_cache": [name for name in known if name in connected],
+            "scanned": sorted(seen - cached),
+            "connect_times": connect_times,
+            # Stale cache entries don't hold this back; every reachable device counts
+            "time_to_all_connected": (max(connect_times.values())
+                                      if connect_times and set(failed) <= set(stale) else None),
+            "total_time": time.perf_counter() - start,
+        }
+        return [connected[name] for name in names if name in connected], report
@@ -10,6 +10,8 @@ DMX_RX_CHAR_UUID = "0000C002-0000-1000-8000-00805F9B34FB"
 class BLEDevice:
     """Represents a generic BLE device."""
 
+    client_factory = BleakClient  # Called with the address on connect(); replaceable for simulation
+
     def __init__(self, address, name):
         self.address = address
         self.name = name
@@ -18,7 +20,7 @@ class BLEDevice:
     async def connect(self):
         """Connect to the BLE device."""
         log.info(f"Connecting to {self.name} ({self.address})...")
-        self.client = BleakClient(self.address)
+        self.client = self.client_factory(self.address)
         await self.client.connect()
         log.info(f"Connected to {self.name}")
 
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from .ble2led import Ble2Led, CONN_INTERVAL
+
+log = logging.getLogger("Ble2LedGroup")
+
+
+class Ble2LedGroup:
+    """Commits the staged DMX state of several Ble2Led devices as one synchronized frame.
+
+    Setters on the member devices (or their b2lSingle channels) only stage changes in the
+    device buffers. `commit()` writes every dirty device concurrently, bounded by
+    `write_timeout`, and records the send skew between the first and last device. The
+    frame loop started by `start()` commits on a fixed grid for continuous updates (e.g. VU),
+    so the group replaces the per-device flush loops of its members.
+    """
+
+    def __init__(self, devices=(), conn_interval=CONN_INTERVAL, intervals_per_frame=2, write_timeout=0.1):
+        """
+        :param devices: Initial Ble2Led members.
+        :param intervals_per_frame: Frame period of the start() loop in BLE connection intervals.
+        :param write_timeout: Upper bound for one frame commit in seconds.
+        """
+        self.devices = []
+        self.frame_interval = conn_interval * intervals_per_frame
+        self.write_timeout = write_timeout
+        self.commit_lock = asyncio.Lock()
+        self.run_task = None
+
+        self.commits = 0
+        self.writes = 0
+        self.timeouts = 0
+        self.last_skew = 0.0
+        self.max_skew = 0.0
+        self._skew_total = 0.0
+        self._skew_samples = 0
+
+        for device in devices:
+            self.add(device)
+
+    def add(self, device: Ble2Led):
+        """Take over flushing for `device`."""
+        device.auto_flush = False
+        if device.flush_task:
+            device.flush_task.cancel()
+            device.flush_task = None
+        self.devices.append(device)
+
+    def remove(self, device: Ble2Led):
+        """Hand flushing back to the device itself."""
+        self.devices.remove(device)
+        device.auto_flush = True
+        if device.client and device.client.is_connected:
+            device.start_flush_loop()
+
+    def isDirty(self):
+        return any(device.dirty_flag for device in self.devices)
+
+    async def _timed_write(self, device):
+        await device._write_frame()
+        return time.perf_counter()
+
+    async def commit(self):
+        """Send all staged changes as one frame; returns the send skew in seconds."""
+        async with self.commit_lock:
+            dirty = [device for device in self.devices
+                     if device.dirty_flag and device.client and device.client.is_connected]
+            if not dirty:
+                return 0.0
+
+            try:
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(self._timed_write(device) for device in dirty), return_exceptions=True),
+                    timeout=self.write_timeout,
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                log.warning(f"Frame commit exceeded {self.write_timeout * 1000:.0f} ms.")
+                return None
+
+            done = [t for t in results if not isinstance(t, Exception)]
+            for device, result in zip(dirty, results):
+                if isinstance(result, Exception):
+                    log.error(f"Write to {device.name} failed: {result}")
+
+            self.commits += 1
+            self.writes += len(done)
+            skew = max(done) - min(done) if len(done) > 1 else 0.0
+            self.last_skew = skew
+            self.max_skew = max(self.max_skew, skew)
+            self._skew_total += skew
+            self._skew_samples += 1
+            return skew
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.frame_interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Fell behind; don't burst to catch up
+            if self.isDirty():
+                await self.commit()
+
+    def start(self):
+        """Start committing on the fixed frame grid."""
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the frame loop and send whatever is still staged."""
+        if self.run_task:
+            self.run_task.cancel()
+            try:
+                await self.run_task
+            except asyncio.CancelledError:
+                pass
+            self.run_task = None
+        await self.commit()
+
+    def getStats(self):
+        """Commit counters and send skew (spread of write completion times) in milliseconds."""
+        return {
+            "devices": len(self.devices),
+            "commits": self.commits,
+            "writes": self.writes,
+            "timeouts": self.timeouts,
+            "last_skew_ms": self.last_skew * 1000.0,
+            "mean_skew_ms": self._skew_total / self._skew_samples * 1000.0 if self._skew_samples else 0.0,
+            "max_skew_ms": self.max_skew * 1000.0,
+        }
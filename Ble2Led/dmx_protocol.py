@@ -0,0 +1,102 @@
+"""Packet formats for writes to the Ble2Led DMX characteristic.
+
+Legacy firmware only understands the prefix format: a packet of n bytes sets channels
+0..n-1. Firmware that exposes the capability characteristic reports the compact formats
+it supports as a bit set; once the host writes back the formats it wants to use, every
+packet starts with a format byte:
+
+    0x00 PREFIX  values of channels 0..n-1
+    0x01 SPAN    start channel, values of channels start..start+n-1
+    0x02 MASK    2-byte little-endian channel mask, values of the set channels in order
+
+Changed channels are passed around as an int bit mask (bit i = channel i).
+"""
+
+DMX_CHANNELS = 10
+
+DMX_RX_CHAR_UUID = "0000C002-0000-1000-8000-00805F9B34FB"
+DMX_CAPS_CHAR_UUID = "0000C003-0000-1000-8000-00805F9B34FB"
+
+FORMAT_PREFIX = 0x00
+FORMAT_SPAN = 0x01
+FORMAT_MASK = 0x02
+
+CAP_SPAN = 0x01
+CAP_MASK = 0x02
+CAP_ALL = CAP_SPAN | CAP_MASK
+
+# Bytes around the ATT payload of one write without response on the 1M PHY:
+# preamble 1, access address 4, LL header 2, L2CAP header 4, ATT opcode + handle 3, CRC 3
+BLE_PACKET_OVERHEAD = 17
+BLE_US_PER_BYTE = 8
+
+
+def airtime_us(payload_len):
+    """On-air time in microseconds of one write carrying `payload_len` bytes."""
+    return (BLE_PACKET_OVERHEAD + payload_len) * BLE_US_PER_BYTE
+
+
+def _span(mask):
+    return (mask & -mask).bit_length() - 1, mask.bit_length()
+
+
+def encode(data, mask, caps=0):
+    """Return the smallest packet that carries the channels in `mask`.
+
+    :param data: Full channel buffer.
+    :param mask: Changed channels; must not be 0.
+    :param caps: Negotiated CAP_* bits; 0 selects the legacy prefix format.
+    """
+    end = mask.bit_length()
+    if not caps:
+        return bytes(data[:end])
+
+    lo, hi = _span(mask)
+    best, size = FORMAT_PREFIX, end
+    if caps & CAP_SPAN and hi - lo + 1 < size:
+        best, size = FORMAT_SPAN, hi - lo + 1
+    if caps & CAP_MASK and bin(mask).count("1") + 2 < size:
+        best = FORMAT_MASK
+
+    if best == FORMAT_PREFIX:
+        return bytes((FORMAT_PREFIX,)) + bytes(data[:end])
+    if best == FORMAT_SPAN:
+        return bytes((FORMAT_SPAN, lo)) + bytes(data[lo:hi])
+    return bytes((FORMAT_MASK, mask & 0xFF, mask >> 8)) + bytes(
+        data[i] for i in range(end) if mask >> i & 1)
+
+
+def decode(packet, state, compact=False):
+    """Apply `packet` to the channel buffer `state` and return the mask of written channels.
+
+    :param compact: True once compact formats were enabled, i.e. packets carry a format byte.
+    :raises ValueError: On malformed packets.
+    """
+    if not compact:
+        if not 0 < len(packet) <= DMX_CHANNELS:
+            raise ValueError(f"Prefix packet must carry 1-{DMX_CHANNELS} bytes, got {len(packet)}.")
+        state[:len(packet)] = packet
+        return (1 << len(packet)) - 1
+
+    if not packet:
+        raise ValueError("Empty packet.")
+    kind, body = packet[0], packet[1:]
+    if kind == FORMAT_PREFIX:
+        return decode(body, state)
+    if kind == FORMAT_SPAN:
+        if len(body) < 2 or body[0] + len(body) - 1 > DMX_CHANNELS:
+            raise ValueError("Span packet exceeds the channel range.")
+        start, values = body[0], body[1:]
+        state[start:start + len(values)] = values
+        return ((1 << len(values)) - 1) << start
+    if kind == FORMAT_MASK:
+        if len(body) < 2:
+            raise ValueError("Mask packet without mask.")
+        mask = body[0] | body[1] << 8
+        channels = [i for i in range(DMX_CHANNELS) if mask >> i & 1]
+        if mask >> DMX_CHANNELS or not channels or len(channels) != len(body) - 2:
+            raise ValueError("Mask does not match the packet length.")
+        for channel, value in zip(channels, body[2:]):
+            state[channel] = value
+        return mask
+    raise ValueError(f"Unknown packet format 0x{kind:02x}.")
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import time
+import numpy as np
+from .scene import FIXTURE_CHANNELS, FIXTURES_PER_DEVICE
+
+log = logging.getLogger("EffectRenderer")
+
+DIMMER = FIXTURE_CHANNELS.index("d")
+EASING_STEPS = 1024  # Resolution of the easing lookup tables
+
+_t = np.linspace(0.0, 1.0, EASING_STEPS + 1, dtype=np.float64)
+EASINGS = {
+    name: curve.astype(np.float32) for name, curve in {
+        "linear": _t,
+        "in": _t * _t,
+        "out": 1.0 - (1.0 - _t) ** 2,
+        "in_out": _t * _t * (3.0 - 2.0 * _t),  # Smoothstep
+        "exp_out": (1.0 - 2.0 ** (-10.0 * _t)) / (1.0 - 2.0 ** -10.0),  # Fast attack, long tail
+    }.items()
+}
+del _t
+
+
+def ease(table, t):
+    """Look up `t` (scalar or array, clipped to 0-1) in an easing table."""
+    return table[(np.clip(t, 0.0, 1.0) * EASING_STEPS + 0.5).astype(np.intp)]
+
+
+class EffectRenderer:
+    """Renders the 5-channel state of every fixture at a fixed frame rate.
+
+    Each frame is computed with NumPy over all fixtures of a CompiledScene at once: the
+    base is a crossfade from the previous state to the current scene step, and the dimmer
+    is then shaped by an optional chase (a wave running across the fixtures) and strobe
+    envelope (a flash per beat subdivision). All curves come from precomputed easing
+    tables. Timing follows a beat clock fed by the detector's tempo estimate, so fades and
+    envelopes stretch with the music. Only device ranges whose bytes changed since the
+    last frame are staged with `updateDmxRange`; sending them is left to the devices' or
+    a Ble2LedGroup's flush loop.
+    """
+
+    def __init__(self, scene, devices, tempo=None, frame_rate=40.0, fade_beats=0.25, easing="in_out",
+                 default_period=0.5):
+        """
+        :param scene: CompiledScene providing the steps.
+        :param devices: Ble2Led devices in scene order (two fixtures each).
+        :param tempo: Callable returning a tempo estimate (BeatDetector.get_tempo_estimate) or None.
+        :param fade_beats: Crossfade length between steps in beats.
+        :param easing: Easing table name used for crossfades.
+        :param default_period: Beat period in seconds while no tempo estimate is available.
+        """
+        self.scene = scene
+        self.devices = list(devices)
+        self.tempo = tempo
+        self.frame_interval = 1.0 / frame_rate
+        self.fade_beats = fade_beats
+        self.fade_easing = EASINGS[easing]
+        self.default_period = default_period
+        self.enabled = True
+        self.run_task = None
+
+        fixtures = scene.frames.shape[1]
+        self.positions = np.arange(fixtures, dtype=np.float32) / fixtures  # Chase position per fixture
+        self.chase = None
+        self.strobe = None
+
+        # Crossfade state: from `_from` to step `step`, starting at `_fade_start` for `_fade_duration` seconds.
+        # Only these two frames are converted to float; the scene itself may be a memory-mapped file.
+        self.step = 0
+        self._target = scene.frames[0].astype(np.float32)
+        self._from = self._target.copy()
+        self._fade_start = 0.0
+        self._fade_duration = 0.0
+
+        # Beat clock: whole beats counted so far plus the phase since the last beat
+        self.period = default_period
+        self._beat_wall = None
+        self._beat_count = 0
+
+        # Last staged bytes per device, compared to decide what to send
+        self._sent = np.zeros((len(self.devices), FIXTURES_PER_DEVICE * len(FIXTURE_CHANNELS)), dtype=np.uint8)
+        self._sent_valid = False
+
+        self.frames = 0
+        self.changed_frames = 0
+        self.device_writes = 0
+        self._render_total = 0.0
+
+    def set_chase(self, beats=1.0, width=0.5, floor=0.0, easing="out"):
+        """Run a dimmer wave across the fixtures once every `beats` beats (beats=None disables).
+
+        :param width: Length of the wave's tail as a fraction of all fixtures.
+        :param floor: Dimmer factor of fixtures outside the wave.
+        """
+        self.chase = None if beats is None else (beats, width, floor, EASINGS[easing])
+
+    def set_strobe(self, subdivision=1, duty=0.3, floor=0.0, easing="exp_out"):
+        """Flash the dimmer `subdivision` times per beat (subdivision=None disables).
+
+        :param duty: Fraction of each subdivision the flash takes to decay to `floor`.
+        """
+        self.strobe = None if subdivision is None else (subdivision, duty, floor, EASINGS[easing])
+
+    def beat_phase(self, now):
+        """Beats elapsed on the beat clock at `now` (perf_counter()); the fraction is the phase."""
+        estimate = self.tempo() if self.tempo else None
+        if estimate is not None:
+            wall = estimate["last_beat_wall"]
+            self.period = estimate["period"]
+            if self._beat_wall is not None and wall > self._beat_wall:
+                self._beat_count += max(1, round((wall - self._beat_wall) / self.period))
+            self._beat_wall = wall if self._beat_wall is None else max(wall, self._beat_wall)
+        if self._beat_wall is None:
+            return 0.0
+        return self._beat_count + (now - self._beat_wall) / self.period
+
+    def beat(self, now=None):
+        """Register a detected beat for the clock when there is no tempo estimate yet."""
+        now = time.perf_counter() if now is None else now
+        if self.tempo is None or self.tempo() is None:
+            if self._beat_wall is not None:
+                self._beat_count += 1
+            self._beat_wall = now
+
+    def go_to(self, step, now=None, fade_beats=None):
+        """Crossfade from the current state to `step` over `fade_beats` beats (0 = cut)."""
+        now = time.perf_counter() if now is None else now
+        self._from = self._base(now)
+        self.step = step % len(self.scene)
+        self._target = self.scene.frames[self.step].astype(np.float32)
+        self._fade_start = now
+        beats = self.fade_beats if fade_beats is None else fade_beats
+        self._fade_duration = beats * self.period
+
+    def next_step(self, now=None):
+        """Crossfade to the following scene step (looping)."""
+        self.go_to(self.step + 1, now)
+
+    def _base(self, now):
+        target = self._target
+        if self._fade_duration <= 0:
+            return target.copy()
+        alpha = ease(self.fade_easing, (now - self._fade_start) / self._fade_duration)
+        return self._from + (target - self._from) * alpha
+
+    def render(self, now=None):
+        """Compute the frame at `now` as uint8 (fixtures, 5)."""
+        now = time.perf_counter() if now is None else now
+        phase = self.beat_phase(now)
+        frame = self._base(now)
+
+        if self.chase is not None:
+            beats, width, floor, table = self.chase
+            head = (phase / beats) % 1.0
+            behind = (head - self.positions) % 1.0  # Distance of each fixture behind the wave's head
+            level = ease(table, 1.0 - behind / width)
+            frame[:, DIMMER] *= floor + (1.0 - floor) * level
+        if self.strobe is not None:
+            subdivision, duty, floor, table = self.strobe
+            level = ease(table, 1.0 - ((phase * subdivision) % 1.0) / duty)
+            frame[:, DIMMER] *= floor + (1.0 - floor) * level
+
+        return (frame + 0.5).astype(np.uint8)
+
+    def output(self, frame):
+        """Stage the device ranges of `frame` that differ from the last staged frame."""
+        rows = frame.reshape(len(frame) // FIXTURES_PER_DEVICE, -1)[:len(self.devices)]
+        if self._sent_valid:
+            changed = np.any(rows != self._sent[:len(rows)], axis=1)
+        else:
+            changed = np.ones(len(rows), dtype=bool)
+        writes = 0
+        for index in np.flatnonzero(changed):
+            span = self.scene.device_ranges[index]
+            if span is not None:
+                self.devices[index].updateDmxRange(span[0], rows[index, span[0]:span[1]].tobytes())
+                writes += 1
+        self._sent[:len(rows)] = rows
+        self._sent_valid = True
+        return writes
+
+    def tick(self, now=None):
+        """Render and stage one frame; returns the number of devices staged."""
+        if not self.enabled:
+            self._sent_valid = False  # Others write meanwhile; resend everything when re-enabled
+            return 0
+        start = time.perf_counter()
+        writes = self.output(self.render(now))
+        self._render_total += time.perf_counter() - start
+        self.frames += 1
+        self.device_writes += writes
+        if writes:
+            self.changed_frames += 1
+        return writes
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.frame_interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # Fell behind; don't burst to catch up
+            try:
+                self.tick()
+            except Exception as e:
+                log.error(f"Rendering failed: {e}")
+
+    def start(self):
+        """Start rendering on the fixed frame grid."""
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.run_task:
+            self.run_task.cancel()
+            try:
+                await self.run_task
+            except asyncio.CancelledError:
+                pass
+            self.run_task = None
+
+    def getStats(self):
+        """Frames rendered, frames that changed any device, device writes and render cost."""
+        return {
+            "frames": self.frames,
+            "changed_frames": self.changed_frames,
+            "device_writes": self.device_writes,
+            "mean_render_ms": self._render_total / self.frames * 1000.0 if self.frames else 0.0,
+        }
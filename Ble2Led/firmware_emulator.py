@@ -0,0 +1,127 @@
+import argparse
+import random
+from .dmx_protocol import (DMX_CHANNELS, DMX_RX_CHAR_UUID, DMX_CAPS_CHAR_UUID, CAP_ALL,
+                           airtime_us, decode, encode)
+
+
+class Ble2LedEmulator:
+    """Python model of the receiving side of a Ble2Led fixture, for tests without hardware.
+
+    Implements the part of the BleakClient interface that Ble2Led uses, so an instance can
+    be assigned to `device.client`. With `caps=0` it behaves like legacy firmware without
+    the capability characteristic, which makes the host fall back to the prefix format.
+    """
+
+    def __init__(self, caps=CAP_ALL, address="emulator"):
+        self.address = address
+        self.supported_caps = caps
+        self.caps = 0  # Formats enabled by the host
+        self.state = bytearray(DMX_CHANNELS)
+        self.is_connected = False
+
+        self.packets = 0
+        self.payload_bytes = 0
+        self.airtime_us = 0
+        self.errors = 0
+
+    @property
+    def compact(self):
+        return self.caps != 0
+
+    async def connect(self):
+        self.is_connected = True
+        self.caps = 0  # Every connection starts in the prefix format
+
+    async def disconnect(self):
+        self.is_connected = False
+
+    async def read_rssi(self):
+        return -50
+
+    async def read_gatt_char(self, uuid):
+        if uuid == DMX_CAPS_CHAR_UUID and self.supported_caps:
+            return bytearray((self.supported_caps,))
+        raise KeyError(f"Characteristic {uuid} was not found!")
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        if uuid == DMX_RX_CHAR_UUID:
+            self.receive(bytes(data))
+        elif uuid == DMX_CAPS_CHAR_UUID and self.supported_caps:
+            self.caps = data[0] & self.supported_caps
+        else:
+            raise KeyError(f"Characteristic {uuid} was not found!")
+
+    def receive(self, packet):
+        """Apply one packet to the channel state like the firmware would."""
+        try:
+            mask = decode(packet, self.state, self.compact)
+        except ValueError:
+            self.errors += 1
+            raise
+        self.packets += 1
+        self.payload_bytes += len(packet)
+        self.airtime_us += airtime_us(len(packet))
+        return mask
+
+    def getStats(self):
+        return {
+            "packets": self.packets,
+            "payload_bytes": self.payload_bytes,
+            "airtime_ms": self.airtime_us / 1000.0,
+            "errors": self.errors,
+        }
+
+
+def simulate(frames, caps):
+    """Send `frames` (channel buffers) through the encoder into an emulator.
+
+    Returns the emulator; raises AssertionError if its state diverges from the host buffer.
+    """
+    emulator = Ble2LedEmulator(caps)
+    emulator.caps = caps
+    host = bytearray(DMX_CHANNELS)
+    for frame in frames:
+        mask = 0
+        for i, value in enumerate(frame):
+            if host[i] != value:
+                mask |= 1 << i
+        if not mask:
+            continue
+        host[:] = frame
+        emulator.receive(encode(host, mask, caps))
+        assert emulator.state == host, f"State mismatch: {list(emulator.state)} != {list(host)}"
+    return emulator
+
+
+def _random_frames(count, seed):
+    """Mix of VU-style dimmer updates on one channel and occasional full scene steps."""
+    rng = random.Random(seed)
+    frame = [0] * DMX_CHANNELS
+    frames = []
+    for _ in range(count):
+        frame = list(frame)
+        if rng.random() < 0.1:
+            frame = [rng.randrange(256) for _ in range(DMX_CHANNELS)]
+        else:
+            frame[rng.choice((3, 8))] = rng.randrange(256)  # CH1 or CH2 dimmer
+        frames.append(frame)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Ble2Led packet formats on the firmware emulator.")
+    parser.add_argument("--frames", type=int, default=10000, help="Number of random frames")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = _random_frames(args.frames, args.seed)
+    baseline = None
+    for label, caps in (("prefix", 0), ("compact", CAP_ALL)):
+        stats = simulate(frames, caps).getStats()
+        baseline = baseline or stats["airtime_ms"]
+        print(f"{label:8s} packets={stats['packets']} bytes={stats['payload_bytes']} "
+              f"airtime={stats['airtime_ms']:.1f} ms ({stats['airtime_ms'] / baseline:.0%})")
+
+
+if __name__ == "__main__":
+    main()
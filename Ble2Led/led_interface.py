@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 class LEDInterface(ABC):
     """Defines LED control functions."""
@@ -15,5 +16,20 @@ class LEDInterface(ABC):
     @abstractmethod
     def setDim(self, value): pass
 
+    @abstractmethod
+    def setStrobe(self, value): pass
+
     @abstractmethod
     def setRGB(self, r, g, b): pass
+
+    def setState(self, r, g, b, dim, strobe):
+        """Set the complete fixture state; implementations should apply it as one update."""
+        with self.batch():
+            self.setRGB(r, g, b)
+            self.setDim(dim)
+            self.setStrobe(strobe)
+
+    @contextmanager
+    def batch(self):
+        """Group several setter calls into one update (no-op unless overridden)."""
+        yield self
@@ -0,0 +1,191 @@
+import argparse
+import json
+import mmap
+import struct
+import time
+import numpy as np
+
+FIXTURE_CHANNELS = ("r", "g", "b", "d", "s")  # JSON keys in DMX channel order
+FIXTURES_PER_DEVICE = 2  # Each Ble2Led drives CH1 (channels 0-4) and CH2 (channels 5-9)
+
+# Binary scene file: header, one "assigned" byte per fixture, padding to FRAME_ALIGN,
+# then one frame of fixtures * 5 bytes per step
+SCENE_MAGIC = b"B2LS"
+SCENE_VERSION = 1
+SCENE_HEADER = struct.Struct("<4sHBxHxxI")  # magic, version, channels per fixture, fixtures, steps
+FRAME_ALIGN = 16
+
+
+class CompiledScene:
+    """Lighting steps compiled to a uint8 array of shape (steps, fixtures, 5).
+
+    Fixture i is CH(i % 2 + 1) of Ble2Led device i // 2, i.e. the order in which the
+    application creates its b2lSingle channels. A fixture a step does not mention keeps
+    the state of the previous step (wrapping around, since playback loops); fixtures no
+    step mentions are never written. Applying a step is one range update per device.
+    """
+
+    def __init__(self, frames, assigned, load_time=0.0, compile_time=0.0, mapping=None):
+        """
+        :param frames: uint8 array (steps, fixtures, 5) with an even number of fixtures.
+        :param assigned: bool array (fixtures,), False for fixtures no step mentions.
+        :param mapping: mmap backing `frames`, kept open for the lifetime of the scene.
+        """
+        self.frames = frames
+        self.mapping = mapping
+        self.assigned = assigned
+        self.load_time = load_time
+        self.compile_time = compile_time
+        self.device_frames = frames.reshape(len(frames), -1, FIXTURES_PER_DEVICE * len(FIXTURE_CHANNELS))
+        self._flat = memoryview(np.ascontiguousarray(self.device_frames).reshape(-1))
+
+        # Channel range each device receives: both fixtures, one of them or nothing
+        width = len(FIXTURE_CHANNELS)
+        self.device_ranges = []
+        for ch1, ch2 in assigned.reshape(-1, FIXTURES_PER_DEVICE):
+            if ch1 or ch2:
+                self.device_ranges.append((0 if ch1 else width, 2 * width if ch2 else width))
+            else:
+                self.device_ranges.append(None)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def from_steps(cls, steps, device_count):
+        """Validate and compile the "steps" list of a ble2led scene for `device_count` devices.
+
+        Entries whose id exceeds the connected fixtures are ignored.
+        :raises ValueError: On malformed steps or values outside 0-255.
+        """
+        start = time.perf_counter()
+        if not isinstance(steps, list) or not steps:
+            raise ValueError("Scene has no steps.")
+
+        fixtures = device_count * FIXTURES_PER_DEVICE
+        values = np.zeros((len(steps), fixtures, len(FIXTURE_CHANNELS)), dtype=np.uint8)
+        given = np.zeros((len(steps), fixtures), dtype=bool)
+        for i, step in enumerate(steps):
+            if not isinstance(step, list):
+                raise ValueError(f"Step {i + 1} is not a list.")
+            for j, entry in enumerate(step):
+                try:
+                    fixture = entry["id"] - 1
+                    row = [entry[key] for key in FIXTURE_CHANNELS]
+                except (KeyError, TypeError):
+                    raise ValueError(f"Step {i + 1}, entry {j + 1}: needs id, {', '.join(FIXTURE_CHANNELS)}.") from None
+                if not isinstance(fixture, int) or fixture < 0:
+                    raise ValueError(f"Step {i + 1}, entry {j + 1}: id must be a positive integer.")
+                if not all(isinstance(v, int) and 0 <= v <= 255 for v in row):
+                    raise ValueError(f"Step {i + 1}, entry {j + 1}: DMX values must be between 0-255.")
+                if fixture < fixtures:
+                    values[i, fixture] = row
+                    given[i, fixture] = True
+
+        # Carry unmentioned fixtures forward: find the last step that set each fixture, looking
+        # through the scene twice for the wrap-around; unused fixtures map to a zero row
+        count = len(steps)
+        order = np.where(np.concatenate([given, given]), np.arange(2 * count)[:, None], -1)
+        last = np.maximum.accumulate(order, axis=0)[count:]
+        last = np.where(last >= 0, last % count, count)
+        padded = np.concatenate([values, np.zeros((1,) + values.shape[1:], dtype=np.uint8)])
+        frames = padded[last, np.arange(fixtures)]
+
+        return cls(frames, given.any(axis=0), compile_time=time.perf_counter() - start)
+
+    def apply(self, step, devices, outputs=None):
+        """Stage step `step` on the Ble2Led `devices` (only those in `outputs`, if given).
+
+        Devices beyond the fixtures of the scene are left alone.
+        """
+        stride = self.device_frames.shape[2]
+        offset = step * self.device_frames.shape[1] * stride
+        for device, span in zip(devices, self.device_ranges):
+            if span is not None and (outputs is None or device in outputs):
+                device.updateDmxRange(span[0], self._flat[offset + span[0]:offset + span[1]])
+            offset += stride
+
+    def save(self, path):
+        """Write the scene in the binary format read by load_binary_scene()."""
+        fixtures = self.frames.shape[1]
+        with open(path, "wb") as f:
+            f.write(SCENE_HEADER.pack(SCENE_MAGIC, SCENE_VERSION, len(FIXTURE_CHANNELS), fixtures, len(self)))
+            f.write(self.assigned.astype(np.uint8).tobytes())
+            f.write(bytes(-(SCENE_HEADER.size + fixtures) % FRAME_ALIGN))
+            f.write(np.ascontiguousarray(self.frames).tobytes())
+
+
+def load_binary_scene(path):
+    """Memory-map a binary scene file; frames are paged in when a step is first applied."""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapping) < SCENE_HEADER.size:
+        raise ValueError("Not a binary scene file.")
+    magic, version, channels, fixtures, steps = SCENE_HEADER.unpack_from(mapping)
+    if magic != SCENE_MAGIC:
+        raise ValueError("Not a binary scene file.")
+    if version != SCENE_VERSION or channels != len(FIXTURE_CHANNELS):
+        raise ValueError(f"Unsupported scene file version {version}.")
+
+    frames_offset = SCENE_HEADER.size + fixtures
+    frames_offset += -frames_offset % FRAME_ALIGN
+    if not steps or fixtures % FIXTURES_PER_DEVICE or len(mapping) != frames_offset + steps * fixtures * channels:
+        raise ValueError("Binary scene file is truncated or corrupt.")
+
+    assigned = np.frombuffer(mapping, dtype=np.uint8, count=fixtures, offset=SCENE_HEADER.size).astype(bool)
+    frames = np.frombuffer(mapping, dtype=np.uint8, offset=frames_offset).reshape(steps, fixtures, channels)
+    return CompiledScene(frames, assigned, load_time=time.perf_counter() - start, mapping=mapping)
+
+
+def load_scene(path, device_count):
+    """Load a binary scene file, or a ble2led JSON scene file compiled for `device_count` devices.
+
+    :raises ValueError: On invalid files.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(SCENE_MAGIC)) == SCENE_MAGIC:
+            return load_binary_scene(path)
+
+    start = time.perf_counter()
+    with open(path, "r") as f:
+        data = json.load(f)
+    load_time = time.perf_counter() - start
+
+    if not isinstance(data, dict) or data.get("type") != "ble2led" or "steps" not in data:
+        raise ValueError("Not a ble2led scene file.")
+    scene = CompiledScene.from_steps(data["steps"], device_count)
+    scene.load_time = load_time
+    return scene
+
+
+def convert_json_scene(json_path, binary_path):
+    """Compile a ble2led JSON scene for all fixture ids it uses and save it in the binary format."""
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("type") != "ble2led" or "steps" not in data:
+        raise ValueError("Not a ble2led scene file.")
+
+    ids = [entry.get("id", 0) for step in data["steps"] if isinstance(step, list)
+           for entry in step if isinstance(entry, dict)]
+    max_id = max((i for i in ids if isinstance(i, int)), default=0)
+    scene = CompiledScene.from_steps(data["steps"], max(1, -(-max_id // FIXTURES_PER_DEVICE)))
+    scene.save(binary_path)
+    return scene
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a ble2led JSON scene to the binary scene format.")
+    parser.add_argument("json_file", help="Scene list in the JSON format")
+    parser.add_argument("binary_file", help="Output file (e.g. show.b2ls)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scene = convert_json_scene(args.json_file, args.binary_file)
+    print(f"Wrote {len(scene)} steps for {scene.frames.shape[1]} fixtures to {args.binary_file} "
+          f"in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
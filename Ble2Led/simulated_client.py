@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+from .ble2led import Ble2Led, CONN_INTERVAL
+from .b2l_single import b2lSingle
+from .device_group import Ble2LedGroup
+from .dmx_protocol import CAP_ALL, DMX_RX_CHAR_UUID
+from .firmware_emulator import Ble2LedEmulator
+
+
+class SimulatedBleClient(Ble2LedEmulator):
+    """Drop-in BleakClient for Ble2Led that models the throughput of a BLE link.
+
+    Writes without response go into a transmit buffer of `buffer_packets` entries. Every
+    connection interval up to `packets_per_interval` of them are sent; each is lost with
+    probability `drop_rate`, the rest reach the firmware emulator. When the buffer is full
+    a write either waits for space ("block", like flow-controlled stacks) or is discarded
+    ("drop"). Every write is recorded in `records` as a dict with submit/delivery times.
+    """
+
+    def __init__(self, address="simulated", conn_interval=CONN_INTERVAL, packets_per_interval=1,
+                 buffer_packets=4, on_full="block", drop_rate=0.0, connect_delay=0.0, caps=CAP_ALL, seed=None):
+        super().__init__(caps=caps, address=address)
+        self.conn_interval = conn_interval
+        self.packets_per_interval = packets_per_interval
+        self.buffer_packets = buffer_packets
+        self.on_full = on_full
+        self.drop_rate = drop_rate
+        self.connect_delay = connect_delay
+        self.random = random.Random(seed)
+
+        self.buffer = deque()
+        self.records = []
+        self.link_task = None
+        self._space = None
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_delay)
+        await super().connect()
+        self._space = asyncio.Event()
+        self.link_task = asyncio.create_task(self._link())
+
+    async def disconnect(self):
+        self.drop_link()
+
+    def drop_link(self):
+        """Lose the connection; buffered packets are lost with it."""
+        self.is_connected = False
+        if self.link_task:
+            self.link_task.cancel()
+            self.link_task = None
+        while self.buffer:
+            self.buffer.popleft()["status"] = "lost"
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        if not self.is_connected:
+            raise ConnectionError("Not connected")
+        if uuid != DMX_RX_CHAR_UUID or response:
+            await asyncio.sleep(self.conn_interval)  # One round trip
+            return await super().write_gatt_char(uuid, data, response)
+
+        record = {"submitted": time.perf_counter(), "sent": None, "size": len(data),
+                  "status": "queued", "packet": bytes(data)}
+        self.records.append(record)
+        while len(self.buffer) >= self.buffer_packets:
+            if self.on_full == "drop":
+                record["status"] = "buffer_full"
+                return
+            self._space.clear()
+            await self._space.wait()
+            if not self.is_connected:
+                raise ConnectionError("Disconnected while waiting for buffer space")
+        self.buffer.append(record)
+
+    async def _link(self):
+        loop = asyncio.get_running_loop()
+        next_event = loop.time()
+        while True:
+            next_event += self.conn_interval
+            await asyncio.sleep(max(0.0, next_event - loop.time()))
+            for _ in range(min(self.packets_per_interval, len(self.buffer))):
+                record = self.buffer.popleft()
+                record["sent"] = time.perf_counter()
+                if self.random.random() < self.drop_rate:
+                    record["status"] = "dropped"
+                else:
+                    record["status"] = "delivered"
+                    self.receive(record["packet"])
+            self._space.set()
+
+    def getStats(self):
+        stats = super().getStats()
+        counts = {}
+        for record in self.records:
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        latencies = sorted(r["sent"] - r["submitted"] for r in self.records if r["status"] == "delivered")
+        stats.update({
+            "writes": len(self.records),
+            "statuses": counts,
+            "buffered": len(self.buffer),
+            "mean_latency_ms": sum(latencies) / len(latencies) * 1000.0 if latencies else None,
+            "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000.0 if latencies else None,
+        })
+        return stats
+
+
+async def run_load_test(fixtures, duration, bpm, vu_rate, intervals_per_frame, client_options):
+    """Drive `fixtures` simulated devices through a Ble2LedGroup with beat steps plus VU updates."""
+    devices = []
+    for i in range(fixtures):
+        device = Ble2Led(f"sim-{i}", f"sim-{i}", intervals_per_frame=intervals_per_frame)
+        device.client_factory = lambda address, i=i: SimulatedBleClient(address, seed=i, **client_options)
+        devices.append(device)
+    group = Ble2LedGroup(devices, intervals_per_frame=intervals_per_frame)
+    await asyncio.gather(*(device.connect() for device in devices))
+    channels = [b2lSingle(device, ch) for device in devices for ch in (0, 1)]
+
+    rng = random.Random(0)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    next_beat = start
+    group.start()
+    while loop.time() - start < duration:
+        if loop.time() >= next_beat:
+            next_beat += 60.0 / bpm
+            for channel in channels:
+                channel.setState(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255, 0)
+            await group.commit()
+        else:
+            level = rng.randrange(256)
+            for channel in channels:
+                channel.setDim(level)
+        await asyncio.sleep(1.0 / vu_rate)
+    await group.stop()
+    await asyncio.sleep(0.1)  # Let the links drain their buffers
+
+    results = [(device, device.client.getStats()) for device in devices]
+    for device in devices:
+        await device.disconnect()
+    return group, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Ble2Led against simulated BLE links.")
+    parser.add_argument("--fixtures", type=int, default=8, help="Number of virtual Ble2Led devices")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--bpm", type=float, default=128.0)
+    parser.add_argument("--vu-rate", type=float, default=100.0, help="VU updates per second")
+    parser.add_argument("--intervals-per-frame", type=int, default=2)
+    parser.add_argument("--conn-interval", type=float, default=CONN_INTERVAL)
+    parser.add_argument("--packets-per-interval", type=int, default=1)
+    parser.add_argument("--buffer", type=int, default=4, help="Write-without-response buffer in packets")
+    parser.add_argument("--on-full", choices=("block", "drop"), default="block")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    client_options = {
+        "conn_interval": args.conn_interval,
+        "packets_per_interval": args.packets_per_interval,
+        "buffer_packets": args.buffer,
+        "on_full": args.on_full,
+        "drop_rate": args.drop_rate,
+    }
+    group, results = asyncio.run(run_load_test(args.fixtures, args.duration, args.bpm, args.vu_rate,
+                                               args.intervals_per_frame, client_options))
+
+    print(f"Group: {group.getStats()}")
+    for device, stats in results:
+        device_stats = device.getStats()
+        print(f"{device.name}: updates={device_stats['updates']} writes={stats['writes']} "
+              f"statuses={stats['statuses']} mean={stats['mean_latency_ms'] or 0:.1f} ms "
+              f"p95={stats['p95_latency_ms'] or 0:.1f} ms airtime={stats['airtime_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+log = logging.getLogger("ConnectionSupervisor")
+
+
+class _Link:
+    """Connection bookkeeping of one supervised device."""
+
+    def __init__(self, connected, now):
+        self.connected = connected
+        self.since = now  # Start of the current up/down period
+        self.uptime = 0.0
+        self.downtime = 0.0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.durations = deque(maxlen=50)  # Seconds from detected drop to reconnected
+        self.task = None
+
+    def account(self, now):
+        if self.connected:
+            self.uptime += now - self.since
+        else:
+            self.downtime += now - self.since
+        self.since = now
+
+
+class ConnectionSupervisor:
+    """Reconnects dropped Ble2Led devices in the background.
+
+    A monitor task polls the link state of every device. When one drops, a separate task
+    reconnects it with exponential backoff, so neither the beat path nor the writes to the
+    healthy devices wait for it. While a device is down its buffer keeps collecting changes
+    (only the latest state survives, writes are skipped); after the reconnect the full
+    buffer is marked for resending, since the fixture may have lost its state.
+    """
+
+    def __init__(self, devices=(), check_interval=0.5, min_backoff=0.5, max_backoff=10.0, connect_timeout=10.0):
+        """
+        :param check_interval: Seconds between link state checks.
+        :param min_backoff: First delay after a failed reconnect; doubles up to `max_backoff`.
+        :param connect_timeout: Upper bound for one connect attempt in seconds.
+        """
+        self.check_interval = check_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.links = {}
+        self.monitor_task = None
+
+        for device in devices:
+            self.add(device)
+
+    @staticmethod
+    def _is_connected(device):
+        return bool(device.client and device.client.is_connected)
+
+    def add(self, device):
+        self.links[device] = _Link(self._is_connected(device), time.perf_counter())
+
+    def remove(self, device):
+        link = self.links.pop(device)
+        if link.task:
+            link.task.cancel()
+
+    def start(self):
+        """Start monitoring; call from the asyncio loop that owns the devices."""
+        if self.monitor_task is None:
+            self.monitor_task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        """Stop monitoring and cancel reconnects in progress."""
+        tasks = [link.task for link in self.links.values() if link.task]
+        if self.monitor_task:
+            tasks.append(self.monitor_task)
+            self.monitor_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for link in self.links.values():
+            link.task = None
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for device, link in list(self.links.items()):
+                if link.connected and not self._is_connected(device):
+                    now = time.perf_counter()
+                    link.account(now)
+                    link.connected = False
+                    log.warning(f"{device.name} disconnected, reconnecting in the background.")
+                    link.task = asyncio.create_task(self._reconnect(device, link, now))
+
+    async def _reconnect(self, device, link, lost_at):
+        backoff = self.min_backoff
+        while True:
+            try:
+                await asyncio.wait_for(device.connect(), self.connect_timeout)
+                break
+            except Exception as e:
+                link.failed_attempts += 1
+                log.info(f"Reconnecting {device.name} failed ({e!r}), retrying in {backoff:.1f} s.")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+        now = time.perf_counter()
+        link.account(now)
+        link.connected = True
+        link.reconnects += 1
+        link.durations.append(now - lost_at)
+        link.task = None
+        device.invalidate()  # Resend the full latest state
+        log.info(f"{device.name} reconnected after {now - lost_at:.2f} s.")
+
+    def getStats(self):
+        """Per-device uptime ratio and reconnect statistics (durations in seconds)."""
+        now = time.perf_counter()
+        stats = {}
+        for device, link in self.links.items():
+            link.account(now)
+            supervised = link.uptime + link.downtime
+            durations = link.durations
+            stats[device.name] = {
+                "connected": link.connected,
+                "uptime": link.uptime / supervised if supervised else 1.0,
+                "reconnects": link.reconnects,
+                "failed_attempts": link.failed_attempts,
+                "last_reconnect_s": durations[-1] if durations else None,
+                "mean_reconnect_s": sum(durations) / len(durations) if durations else None,
+                "max_reconnect_s": max(durations) if durations else None,
+            }
+        return stats
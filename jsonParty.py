@@ -1,13 +1,19 @@
+from BeatDetection.startup import StartupProfiler
+STARTUP = StartupProfiler()  # Created before the remaining imports so they are part of the report
+
 import sys
 import asyncio
-import json
 import logging
 import os
-from tkinter import Tk, filedialog
 from Ble2Led.ble_controller import BleController
-from Ble2Led.ble2ledThreaded import Ble2Led
+from Ble2Led.device_group import Ble2LedGroup
+from Ble2Led.supervisor import ConnectionSupervisor
 from Ble2Led.b2l_single import b2lSingle
+from Ble2Led.scene import load_scene
+from Ble2Led.effects import EffectRenderer
 import BeatDetection.BeatDetector as bd
+from BeatDetection.tracing import LatencyTracer
+from BeatDetection.scheduler import PredictiveBeatScheduler
 
 # Workaround for Windows BLE async bug
 sys.coinit_flags = 0  # 0 means MTA
@@ -17,101 +23,162 @@ try:
 except ImportError:
     pass  # Other OSes or older Bleak versions will ignore this
 
+STARTUP.mark("import")
+
+logging.basicConfig(format=bd.LOG_FORMAT, level=logging.INFO)
 logging.getLogger("Ble2Led").setLevel(logging.DEBUG)
 
 class DMXBeatController:
     """Automatically connects to DMX BLE devices and syncs lights to beats."""
 
-    def __init__(self):
+    def __init__(self, trace_file=None, trace_interval=10.0, predictive=True, effects=False):
+        """
+        :param trace_file: If set, beat-to-light latencies are traced and dumped to this JSON file.
+        :param trace_interval: Seconds between periodic trace dumps.
+        :param predictive: Fire lighting steps ahead of the predicted beat when the tempo is stable.
+        :param effects: Crossfade between steps with the tempo-synced EffectRenderer instead of cutting on beats.
+        """
         self.dmx_controller = BleController()
+        self.physical_devices = []  # Ble2Led instances (each drives two b2lSingle channels)
+        self.group = Ble2LedGroup()  # Commits all fixtures as one frame
+        self.supervisor = ConnectionSupervisor()  # Reconnects dropped fixtures in the background
+        self.predictive = predictive
+        self.scheduler = None
+        self.effects = effects
+        self.renderer = None
+        self.predicted_beat_id = None
+        self.predicted_step = 0
+        self.tracer = LatencyTracer() if trace_file else None
+        self.trace_file = trace_file
+        self.trace_interval = trace_interval
         self.connected_devices = []  # Stores a list of b2lSingle instances
-        self.lighting_steps = []
+        self.lighting_steps = []  # CompiledScene once a file is loaded
         self.current_step = 0
         self.useBeat = True
+        self.startup = STARTUP
+        self.startup_reported = False
 
     async def discover_devices(self):
-        """Scans for available BLE DMX devices and connects to them."""
-        devices = await self.dmx_controller.findDevices()
+        """Connects to the known DMX devices concurrently, scanning only for missing ones."""
+        devices, report = await self.dmx_controller.connectAll(setup=self.setup_device)
 
         if not devices:
             print("No DMX devices found.")
             return False
 
-        print("\nFound DMX Devices:")
-        for i, device in enumerate(devices):
-            print(f"{i}: {device}")
+        print("\nConnected DMX Devices:")
+        for i, dmx in enumerate(devices):
+            print(f"{i}: {dmx.name} ({report['connect_times'][dmx.name]:.2f} s)")
+        for name in report["failed"]:
+            print(f"⚠ Could not connect to {name}")
 
-        # Auto-connect to all found devices
-        for device_name in devices:
-            ble_device = self.dmx_controller.getDevice(device_name)
-            dmx = Ble2Led(ble_device.address, ble_device.name)
-            await dmx.connect()
+        for dmx in devices:
+            self.physical_devices.append(dmx)
 
             # Add both CH1 and CH2 as separate controllable devices
             self.connected_devices.append(b2lSingle(dmx, 0))  # CH1
             self.connected_devices.append(b2lSingle(dmx, 1))  # CH2
 
+        if report["time_to_all_connected"] is not None:
+            print(f"⏱ All devices connected after {report['time_to_all_connected']:.2f} s "
+                  f"({len(report['from_cache'])} from cache, {len(report['scanned'])} scanned)")
         print(f"✅ Connected to {len(self.connected_devices)} logical devices.")
         return True
 
+    def setup_device(self, dmx):
+        """Prepares a freshly connected Ble2Led for tracing and group commits."""
+        dmx.tracer = self.tracer
+        self.group.add(dmx)
+        self.supervisor.add(dmx)
+
     def load_json_file(self):
         """Prompts the user to select a JSON file and loads lighting steps."""
+        from tkinter import Tk, filedialog  # Only needed for the file dialog
+
         root = Tk()
         root.withdraw()  # Hide the root window
-        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        file_path = filedialog.askopenfilename(filetypes=[("Scene files", "*.json *.b2ls"),
+                                                          ("JSON files", "*.json"),
+                                                          ("Binary scenes", "*.b2ls")])
 
         if not file_path:
             print("❌ No file selected.")
             return False
 
-        with open(file_path, "r") as f:
-            data = json.load(f)
-
-        if data.get("type") != "ble2led" or "steps" not in data:
-            print("❌ Invalid JSON format.")
+        try:
+            scene = load_scene(file_path, len(self.physical_devices))
+        except ValueError as e:  # Includes json.JSONDecodeError
+            print(f"❌ Invalid scene file: {e}")
             return False
 
-        self.lighting_steps = data["steps"]
-        print(f"✅ Loaded {len(self.lighting_steps)} lighting steps from {os.path.basename(file_path)}")
+        self.lighting_steps = scene
+        print(f"✅ Loaded {len(scene)} lighting steps from {os.path.basename(file_path)} "
+              f"(load {scene.load_time * 1000:.1f} ms, compile {scene.compile_time * 1000:.1f} ms)")
         return True
 
-    async def apply_lighting_step(self):
-        """Sets all lights according to the current lighting step."""
+    async def apply_lighting_step(self, step_index=None, outputs=None):
+        """Sets all lights according to the current lighting step.
+
+        :param step_index: Step to apply without advancing (default: current step, then advance).
+        :param outputs: Only update channels of these Ble2Led devices (default: all).
+        """
         if not self.lighting_steps:
             print("⚠ No lighting steps loaded.")
             return
 
-        step = self.lighting_steps[self.current_step]  # Get the current step
-        for i, device_data in enumerate(step):
-            device_id = device_data["id"] - 1  # Convert to zero-based index
-            # If the ID is out of range, ignore it
-            if device_id >= len(self.connected_devices):
-                continue
-            # If there are fewer JSON entries than devices, reuse ID=1 (device index 0)
-            device = self.connected_devices[device_id] if device_id < len(self.connected_devices) else self.connected_devices[0]
-            device.setRGB(device_data["r"], device_data["g"], device_data["b"])
-            device.setDim(device_data["d"])
-            device.setStrobe(device_data["s"])
+        advance = step_index is None
+        self.lighting_steps.apply(self.current_step if advance else step_index, self.physical_devices, outputs)
 
         # Move to the next step (looping back to start if needed)
-        print((self.current_step + 1))
-        self.current_step = (self.current_step + 1) % len(self.lighting_steps)
+        if advance:
+            print((self.current_step + 1))
+            self.current_step = (self.current_step + 1) % len(self.lighting_steps)
+
+    async def on_predicted_beat(self, beat_id, outputs):
+        """Called by the scheduler ahead of a predicted beat for one latency group of devices."""
+        if beat_id != self.predicted_beat_id:
+            # First group of a new beat claims the next step
+            self.predicted_beat_id = beat_id
+            self.predicted_step = self.current_step
+            self.current_step = (self.current_step + 1) % len(self.lighting_steps)
+        await self.apply_lighting_step(step_index=self.predicted_step, outputs=outputs)
+        await self.group.commit()
 
     
     async def run(self):
         """Main execution loop: Discover devices, load JSON, and wait for beats."""
+        loop = asyncio.get_running_loop()
+        detector = bd.BeatDetector(callback=self.on_beat_detected, vuCallback=self.onVuUpdate, loop=loop,
+                                   tracer=self.tracer, profiler=self.startup)
+        # Load and warm up the beat tracking models while the BLE devices connect
+        prepared = loop.run_in_executor(None, detector.prepare)
+
         print("\n🔍 Discovering DMX devices...")
-        if not await self.discover_devices():
+        with self.startup.stage("device discovery"):
+            found = await self.discover_devices()
+        if not found:
             return
 
         print("\n📂 Select a JSON file with lighting steps...")
         if not self.load_json_file():
             return
 
+        with self.startup.stage("model wait"):
+            await prepared
         print("\n🎵 Waiting for beats to trigger lighting changes...")
-        loop = asyncio.get_running_loop()
-        detector = bd.BeatDetector(callback=self.on_beat_detected, vuCallback=self.onVuUpdate, loop=loop)
+        self.group.start()
+        self.supervisor.start()
         detector.run()
+        if self.tracer:
+            self.tracer.start_periodic_dump(self.trace_file, self.trace_interval)
+        if self.effects:
+            # The renderer times its fades from the tempo estimate; beats only pick the next step
+            self.renderer = EffectRenderer(self.lighting_steps, self.physical_devices,
+                                           tempo=detector.get_tempo_estimate)
+            self.renderer.start()
+        elif self.predictive:
+            self.scheduler = PredictiveBeatScheduler(detector, self.on_predicted_beat, self.physical_devices)
+            asyncio.create_task(self.scheduler.run())
 
         try:
             while True:
@@ -143,31 +210,58 @@ class DMXBeatController:
     #         print(f"Error in vu_to_led: {e}")  # Catch exceptions
 
     async def onVuUpdate(self, vu):
-        """Triggered on each VU update - can be used for debugging."""
+        """Triggered with the latest VU level at the detector's VU rate (30 Hz by default)."""
         val = self.vu_to_led(vu)
         #print(f"🔊 VU: {val}")
         #device.setRGB(255, 255, 255)
         #device.setStrobe(device_data["s"])
         if not self.useBeat:
             for device in self.connected_devices:
-                print("set dimmer to " + str(val))
-                device.setRGB(255, 180, 100)
-                device.setDim(val)
+                with device.batch():
+                    device.setRGB(255, 180, 100)
+                    device.setDim(val)
                 
 
 
     async def on_beat_detected(self, isBeat):
         """Triggered on each beat - applies the next lighting step."""
+        if self.tracer:
+            self.tracer.mark("handler")
+        if not self.startup_reported:
+            self.startup_reported = True
+            print(self.startup.format())
         if(isBeat):
             self.useBeat = True
+            if self.renderer:
+                self.renderer.enabled = True
+                self.renderer.beat()
+                self.renderer.next_step()
+                return  # Staged frame by frame, committed by the group's frame loop
+            if self.scheduler and self.scheduler.predictive:
+                return  # The scheduler already fired this beat ahead of time
             print(f"🎶 Beat detected! Applying step {self.current_step + 1}/{len(self.lighting_steps)}")
             await self.apply_lighting_step()
+            if self.tracer:
+                self.tracer.mark("applied")  # Before the commit, whose write_done closes the trace
+            await self.group.commit()
         else:
             self.useBeat = False
+            if self.renderer:
+                self.renderer.enabled = False  # VU drives the lights
             print("Lichtorgel")
 
     async def cleanup(self):
         """Disconnect all BLE devices before exiting."""
+        await self.supervisor.stop()
+        if self.renderer:
+            await self.renderer.stop()
+            print(f"Effects: {self.renderer.getStats()}")
+        await self.group.stop()
+        print(f"Frame commits: {self.group.getStats()}")
+        print(f"Connections: {self.supervisor.getStats()}")
+        if self.tracer:
+            self.tracer.stop_periodic_dump()
+            self.tracer.dump(self.trace_file)
         for dmx in self.connected_devices:
             await dmx.ble2led.disconnect()
         print("✅ All devices disconnected.")
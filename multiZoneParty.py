@@ -0,0 +1,230 @@
+import sys
+import argparse
+import asyncio
+import json
+import logging
+from Ble2Led.ble_controller import BleController
+from Ble2Led.device_group import Ble2LedGroup
+from Ble2Led.supervisor import ConnectionSupervisor
+from Ble2Led.b2l_single import b2lSingle
+from Ble2Led.scene import load_scene
+from BeatDetection.BeatDetector import LOG_FORMAT
+from BeatDetection.zone_analysis import ZoneAnalysisPool
+
+# Workaround for Windows BLE async bug
+sys.coinit_flags = 0  # 0 means MTA
+try:
+    from bleak.backends.winrt.util import allow_sta
+    allow_sta()  # Required for BLE on Windows GUI applications
+except ImportError:
+    pass  # Other OSes or older Bleak versions will ignore this
+
+log = logging.getLogger("MultiZone")
+
+
+def vu_to_led(vu_db, min_db=-50, max_db=-10):
+    """Convert VU level (dB) to an LED brightness value (0-255)."""
+    vu_db = max(min_db, min(max_db, vu_db))
+    return int(((vu_db - min_db) / (max_db - min_db)) * 255)
+
+
+class Zone:
+    """One room: an audio input, a beat engine, a fixture group and a scene.
+
+    The zone's analysis runs in its own worker process (see ZoneAnalysisPool); its
+    fixtures are committed as one frame through the zone's Ble2LedGroup, independent of
+    the other zones.
+    """
+
+    def __init__(self, name, fixtures, scene, input_device=None, channel=0, channels=1, input_file=None,
+                 engine="madmom", cpu_affinity=None):
+        """
+        :param fixtures: Names of the Ble2Led devices of this zone, in scene id order.
+        :param scene: Path of the zone's scene (.json or .b2ls).
+        :param input_device: sounddevice input (index or name, default: the system input).
+        :param channel: Channel of `input_device` carrying this zone's audio.
+        :param input_file: Replay an audio file instead of capturing (for testing).
+        :param engine: Beat engine of the zone ("madmom" or "flux").
+        :param cpu_affinity: CPU ids the zone's analysis process is pinned to.
+        """
+        self.name = name
+        self.fixtures = list(fixtures)
+        self.scene_path = scene
+        self.input_device = input_device
+        self.channel = channel
+        self.channels = channels
+        self.input_file = input_file
+        self.engine = engine
+        self.cpu_affinity = cpu_affinity
+
+        self.devices = []  # Connected Ble2Led instances, in fixture order
+        self.connected_devices = []  # b2lSingle channels of those devices
+        self.group = Ble2LedGroup()
+        self.scene = None
+        self.current_step = 0
+        self.useBeat = True
+
+    @classmethod
+    def from_config(cls, entry):
+        entry = dict(entry)
+        try:
+            return cls(entry.pop("name"), entry.pop("fixtures"), entry.pop("scene"), **entry)
+        except KeyError as e:
+            raise ValueError(f"Zone entry is missing {e}") from None
+        except TypeError as e:
+            raise ValueError(f"Invalid zone entry: {e}") from None
+
+    def bind(self, devices):
+        """Attach the connected devices of this zone and compile its scene.
+
+        :param devices: Connected Ble2Led instances by name (all zones).
+        :return: Names of the zone's fixtures that are not connected.
+        """
+        missing = [name for name in self.fixtures if name not in devices]
+        for name in self.fixtures:
+            if name in devices:
+                device = devices[name]
+                self.devices.append(device)
+                self.group.add(device)
+                self.connected_devices.append(b2lSingle(device, 0))  # CH1
+                self.connected_devices.append(b2lSingle(device, 1))  # CH2
+        self.scene = load_scene(self.scene_path, len(self.devices))
+        return missing
+
+    def analysis_options(self):
+        """Keyword arguments for ZoneAnalysisPool.add()."""
+        return {
+            "input_device": self.input_device, "channel": self.channel, "channels": self.channels,
+            "input_file": self.input_file, "engine": self.engine, "cpu_affinity": self.cpu_affinity,
+        }
+
+    async def on_beat(self, isBeat):
+        """Applies the zone's next lighting step on a beat; in melody mode VU drives the lights."""
+        self.useBeat = isBeat
+        if not isBeat or self.scene is None or not self.devices:  # Beats may arrive before bind()
+            return
+        self.scene.apply(self.current_step, self.devices)
+        self.current_step = (self.current_step + 1) % len(self.scene)
+        await self.group.commit()
+
+    async def on_vu(self, vu):
+        if self.useBeat:
+            return
+        val = vu_to_led(vu)
+        for device in self.connected_devices:
+            with device.batch():
+                device.setRGB(255, 180, 100)
+                device.setDim(val)
+
+
+def load_zones(path):
+    """Read the zone configuration: {"zones": [{"name", "fixtures", "scene", ...}, ...]}."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    zones = [Zone.from_config(entry) for entry in config.get("zones", [])]
+    if not zones:
+        raise ValueError("No zones configured.")
+
+    names = set()
+    owners = {}
+    for zone in zones:
+        if zone.name in names:
+            raise ValueError(f"Duplicate zone name: {zone.name}")
+        names.add(zone.name)
+        for fixture in zone.fixtures:
+            if fixture in owners:
+                raise ValueError(f"Fixture {fixture} is assigned to zones {owners[fixture]} and {zone.name}")
+            owners[fixture] = zone.name
+    return zones
+
+
+class MultiZoneController:
+    """Runs several zones from one host.
+
+    This process owns every BLE link (one connect pass, one supervisor) and applies the
+    scenes; the analysis of each zone runs in a worker process and reports beats and VU
+    levels back to this loop.
+    """
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.dmx_controller = BleController()
+        self.supervisor = ConnectionSupervisor()  # Reconnects dropped fixtures of all zones
+        self.analysis = None
+
+    async def connect(self):
+        """Connect to the fixtures of all zones concurrently and bind them to their zones."""
+        names = [name for zone in self.zones for name in zone.fixtures]
+        devices, report = await self.dmx_controller.connectAll(names, setup=self.supervisor.add)
+        by_name = {device.name: device for device in devices}
+        for name in report["failed"]:
+            print(f"⚠ Could not connect to {name}")
+
+        for zone in self.zones:
+            try:
+                missing = zone.bind(by_name)
+            except (OSError, ValueError) as e:  # Includes json.JSONDecodeError
+                print(f"❌ Invalid scene for zone {zone.name}: {e}")
+                return False
+            print(f"Zone {zone.name}: {len(zone.devices)}/{len(zone.fixtures)} fixtures, "
+                  f"{len(zone.scene)} steps" + (f" (missing {', '.join(missing)})" if missing else ""))
+        return any(zone.devices for zone in self.zones)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.analysis = ZoneAnalysisPool(loop)
+        for zone in self.zones:
+            self.analysis.add(zone.name, zone.on_beat, zone.on_vu, **zone.analysis_options())
+        # Analysis processes load their models while the BLE devices connect
+        self.analysis.start()
+
+        print("\n🔍 Connecting to the fixtures of all zones...")
+        try:
+            if not await self.connect():
+                print("No DMX devices connected.")
+                return
+
+            for zone in self.zones:
+                zone.group.start()
+            self.supervisor.start()
+            print("\n🎵 Waiting for beats...")
+            while True:
+                await asyncio.sleep(1)
+        finally:
+            await self.cleanup()
+
+    async def cleanup(self):
+        """Stop the analysis processes and disconnect all BLE devices."""
+        loop = asyncio.get_running_loop()
+        if self.analysis:
+            await loop.run_in_executor(None, self.analysis.stop)
+            print(f"Analysis: {self.analysis.getStats()}")
+        await self.supervisor.stop()
+        for zone in self.zones:
+            await zone.group.stop()
+            print(f"Zone {zone.name} frame commits: {zone.group.getStats()}")
+            for device in zone.devices:
+                await device.disconnect()
+        print(f"Connections: {self.supervisor.getStats()}")
+        print("✅ All devices disconnected.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive several fixture groups from separate audio inputs.")
+    parser.add_argument("config", help="Zone configuration (JSON)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    try:
+        zones = load_zones(args.config)
+    except (OSError, ValueError) as e:
+        print(f"❌ Invalid zone configuration: {e}")
+        return
+    try:
+        asyncio.run(MultiZoneController(zones).run())
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped.")
+
+
+if __name__ == "__main__":
+    main()
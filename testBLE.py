@@ -4,6 +4,7 @@ from Ble2Led.ble2led import Ble2Led
 from Ble2Led.b2l_single import b2lSingle
 import logging
 
+logging.basicConfig(level=logging.INFO)
 logging.getLogger("Ble2Led").setLevel(logging.DEBUG)
 
 async def main():
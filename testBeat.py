@@ -3,6 +3,7 @@ import asyncio
 import logging
 import BeatDetection.BeatDetector as bd
 
+logging.basicConfig(format=bd.LOG_FORMAT, level=logging.INFO)
 logging.getLogger("BeatDetector").setLevel(logging.WARNING)  # Options: DEBUG, INFO, WARNING, ERROR
 logging.getLogger("AudioProcessing").setLevel(logging.WARNING)
 logging.getLogger("MadmomProcessor").setLevel(logging.WARNING)
@@ -22,6 +22,7 @@ CONN_INTERVAL_MS = 7.5 / 1000  # Convert to seconds
 # Example data packet (r, g, b, dimmer, strobe)
 DMX_PACKET = bytes([255, 255, 255, 200, 0])  # Modify as needed
 
+logging.basicConfig(format=bd.LOG_FORMAT, level=logging.INFO)
 logging.getLogger("BeatDetector").setLevel(logging.WARNING)  # Options: DEBUG, INFO, WARNING, ERROR
 logging.getLogger("AudioProcessing").setLevel(logging.WARNING)
 logging.getLogger("MadmomProcessor").setLevel(logging.WARNING)
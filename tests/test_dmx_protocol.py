@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import pytest
+from Ble2Led.dmx_protocol import (DMX_CHANNELS, DMX_RX_CHAR_UUID, DMX_CAPS_CHAR_UUID, CAP_SPAN, CAP_MASK, CAP_ALL,
+                                  FORMAT_PREFIX, FORMAT_SPAN, FORMAT_MASK, decode, encode)
+from Ble2Led.firmware_emulator import Ble2LedEmulator, simulate, _random_frames
+
+CAPS = [0, CAP_SPAN, CAP_MASK, CAP_ALL]
+DATA = bytes(range(10, 10 + DMX_CHANNELS))
+MASKS = [0b1, 0b1000, 0b1000000000, 0b100001000, 0b11110000, 0b1010101010, (1 << DMX_CHANNELS) - 1]
+
+
+@pytest.mark.parametrize("caps, mask", list(itertools.product(CAPS, MASKS)))
+def test_round_trip(caps, mask):
+    packet = encode(DATA, mask, caps)
+    state = bytearray(DMX_CHANNELS)
+    written = decode(packet, state, compact=bool(caps))
+
+    assert written & mask == mask  # Every changed channel arrives
+    for i in range(DMX_CHANNELS):
+        assert state[i] == (DATA[i] if written >> i & 1 else 0)
+
+
+@pytest.mark.parametrize("caps, mask, expected", [
+    (CAP_ALL, 0b111, FORMAT_PREFIX),  # Leading channels: prefix is smallest
+    (CAP_SPAN, 0b11110000, FORMAT_SPAN),
+    (CAP_MASK, 0b1000001000, FORMAT_MASK),
+    (CAP_ALL, 0b100000000, FORMAT_SPAN),
+    (CAP_ALL, 0b1000001000, FORMAT_MASK),
+])
+def test_format_choice(caps, mask, expected):
+    assert encode(DATA, mask, caps)[0] == expected
+
+
+def test_compact_packets_are_smaller():
+    mask = 1 << 8  # A single dimmer late in the buffer
+    prefix = encode(DATA, mask)
+    assert len(prefix) == 9
+    for caps in (CAP_SPAN, CAP_MASK, CAP_ALL):
+        assert len(encode(DATA, mask, caps)) < len(prefix)
+    assert len(encode(DATA, (1 << DMX_CHANNELS) - 1, CAP_ALL)) == len(prefix) + 2  # Format byte only
+
+
+@pytest.mark.parametrize("packet, compact", [
+    (b"", False),
+    (bytes(DMX_CHANNELS + 1), False),
+    (b"", True),
+    (bytes((FORMAT_SPAN, 9, 1, 2)), True),  # Past the last channel
+    (bytes((FORMAT_MASK, 0b11, 0, 1)), True),  # Two channels, one value
+    (bytes((FORMAT_MASK, 0, 0b100, 1)), True),  # Channel 10 does not exist
+    (bytes((0x7F, 1)), True),
+])
+def test_malformed_packets_are_rejected(packet, compact):
+    with pytest.raises(ValueError):
+        decode(packet, bytearray(DMX_CHANNELS), compact)
+
+
+@pytest.mark.parametrize("caps", CAPS)
+def test_emulator_follows_host(caps):
+    frames = _random_frames(500, seed=1)
+    emulator = simulate(frames, caps)  # Asserts the state after every packet
+
+    assert emulator.state == bytearray(frames[-1])
+    assert emulator.errors == 0
+
+
+def test_compact_traffic_is_smaller():
+    frames = _random_frames(500, seed=2)
+    prefix = simulate(frames, 0).getStats()
+    compact = simulate(frames, CAP_ALL).getStats()
+
+    assert compact["packets"] == prefix["packets"]
+    assert compact["payload_bytes"] < prefix["payload_bytes"]
+    assert compact["airtime_ms"] < prefix["airtime_ms"]
+
+
+@pytest.mark.parametrize("supported", CAPS)
+def test_emulator_negotiation(supported):
+    async def run():
+        emulator = Ble2LedEmulator(caps=supported)
+        await emulator.connect()
+        try:
+            offered = (await emulator.read_gatt_char(DMX_CAPS_CHAR_UUID))[0]
+        except KeyError:
+            offered = 0  # Legacy firmware: no capability characteristic
+        if offered:
+            await emulator.write_gatt_char(DMX_CAPS_CHAR_UUID, bytes((offered,)))
+        await emulator.write_gatt_char(DMX_RX_CHAR_UUID, encode(DATA, 1 << 8, offered))
+        return offered, emulator
+
+    offered, emulator = asyncio.run(run())
+    assert offered == supported
+    assert emulator.compact == bool(supported)
+    assert emulator.state[8] == DATA[8]
+    assert emulator.packets == 1
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("bleak")
+from Ble2Led import ble2led, ble2ledThreaded  # noqa: E402
+
+
+@pytest.fixture(params=["asyncio", "threaded"])
+def device(request):
+    if request.param == "asyncio":
+        yield ble2led.Ble2Led("00:00:00:00:00:00", "test")
+    else:
+        device = ble2ledThreaded.Ble2Led("00:00:00:00:00:00", "test")
+        yield device
+        device.shutdown()
+
+
+@pytest.mark.parametrize("values", [
+    [1, 2, 3, 4, 5],
+    bytes([1, 2, 3, 4, 5]),
+    bytearray([1, 2, 3, 4, 5]),
+    np.array([1, 2, 3, 4, 5]),  # int64: must not be copied as raw memory
+    np.array([1, 2, 3, 4, 5], dtype=np.uint8),
+])
+def test_update_range_converts_values(device, values):
+    device.updateDmxRange(5, values)
+
+    assert device.data == bytearray([0] * 5 + [1, 2, 3, 4, 5])
+    assert device.changed_mask == 0b1111100000
+    assert device.dirty_flag
+
+
+@pytest.mark.parametrize("start, values", [
+    (8, [1, 2, 3]),  # Past the last channel
+    (-1, [1]),
+    (0, [1, 256]),
+    (0, [1, -1]),
+    (0, np.array([1.5])),
+])
+def test_invalid_range_leaves_state_untouched(device, start, values):
+    with pytest.raises(ValueError):
+        device.updateDmxRange(start, values)
+
+    assert device.data == bytearray(10)
+    assert device.changed_mask == 0
+    assert not device.dirty_flag
@@ -0,0 +1,42 @@
+import numpy as np
+import librosa
+import pytest
+from BeatDetection.onset import StreamingOnsetDetector
+
+SR = 44100
+HOP = 512
+PEAK_PARAMS = dict(pre_max=10, post_max=10, pre_avg=5, post_avg=5, delta=0.7, wait=10)
+
+
+@pytest.fixture(scope="module")
+def clicks():
+    """Click track every 0.5 s over low noise, a whole number of hops long."""
+    n = HOP * 400
+    noise = 0.01 * np.random.default_rng(0).standard_normal(n)
+    return (librosa.clicks(times=np.arange(0.25, n / SR, 0.5), sr=SR, length=n) + noise).astype(np.float32)
+
+
+def stream(signal, block):
+    detector = StreamingOnsetDetector(sr=SR, hop_length=HOP, history_frames=len(signal) // HOP + 10, **PEAK_PARAMS)
+    for start in range(0, len(signal), block):
+        detector.process(signal[start:start + block])
+    return detector
+
+
+@pytest.mark.parametrize("block", [512, 1000, 4096])
+def test_envelope_matches_librosa(clicks, block):
+    reference = librosa.onset.onset_strength(y=clicks, sr=SR, n_fft=2048, hop_length=HOP, n_mels=128, fmax=0.5 * SR)
+    envelope = np.array(stream(clicks, block).envelope)
+
+    assert len(envelope) > 0.95 * len(reference)
+    np.testing.assert_allclose(envelope, reference[:len(envelope)], rtol=0, atol=1e-5)
+
+
+def test_peaks_match_librosa(clicks):
+    detector = stream(clicks, 1000)
+    envelope = np.array(detector.envelope)
+    reference = librosa.util.peak_pick(envelope, **PEAK_PARAMS)
+    decided = len(envelope) - max(PEAK_PARAMS["post_max"], PEAK_PARAMS["post_avg"])  # Look-ahead complete
+
+    assert len(detector.peaks) >= 8
+    np.testing.assert_array_equal(detector.peaks, reference[reference <= decided])
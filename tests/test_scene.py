@@ -0,0 +1,89 @@
+import json
+import numpy as np
+import pytest
+from Ble2Led.scene import (SCENE_HEADER, SCENE_MAGIC, SCENE_VERSION, CompiledScene, convert_json_scene,
+                           load_binary_scene, load_scene)
+
+STEPS = [
+    [{"id": 1, "r": 255, "g": 0, "b": 0, "d": 255, "s": 0},
+     {"id": 4, "r": 0, "g": 0, "b": 255, "d": 128, "s": 10}],
+    [{"id": 1, "r": 0, "g": 255, "b": 0, "d": 200, "s": 0}],  # Fixture 4 keeps its state
+    [{"id": 4, "r": 1, "g": 2, "b": 3, "d": 4, "s": 5}],  # Fixture 1 keeps its state
+]
+
+
+class RecordingDevice:
+    def __init__(self):
+        self.updates = []
+
+    def updateDmxRange(self, start, values):
+        self.updates.append((start, bytes(values)))
+
+
+@pytest.fixture
+def json_scene(tmp_path):
+    path = tmp_path / "scene.json"
+    path.write_text(json.dumps({"type": "ble2led", "steps": STEPS}))
+    return path
+
+
+def test_from_steps_carries_state_forward():
+    scene = CompiledScene.from_steps(STEPS, device_count=2)
+
+    assert scene.frames.shape == (3, 4, 5)
+    assert list(scene.frames[:, 0, 3]) == [255, 200, 200]
+    assert list(scene.frames[:, 3, 3]) == [128, 128, 4]
+    assert list(scene.frames[0, 0]) == [255, 0, 0, 255, 0]
+    assert list(scene.frames[2, 0]) == [0, 255, 0, 200, 0]
+    assert list(scene.assigned) == [True, False, False, True]
+    assert scene.device_ranges == [(0, 5), (5, 10)]
+
+
+def test_binary_round_trip(tmp_path, json_scene):
+    compiled = load_scene(json_scene, device_count=2)
+    path = tmp_path / "scene.b2ls"
+    compiled.save(path)
+
+    loaded = load_binary_scene(path)
+    np.testing.assert_array_equal(loaded.frames, compiled.frames)
+    np.testing.assert_array_equal(loaded.assigned, compiled.assigned)
+    assert loaded.device_ranges == compiled.device_ranges
+    assert load_scene(path, device_count=2).mapping is not None  # Binary file detected by its magic
+
+    expected, actual = [RecordingDevice(), RecordingDevice()], [RecordingDevice(), RecordingDevice()]
+    for step in range(len(compiled)):
+        compiled.apply(step, expected)
+        loaded.apply(step, actual)
+    assert [d.updates for d in actual] == [d.updates for d in expected]
+
+
+def test_convert_json_scene(tmp_path, json_scene):
+    path = tmp_path / "scene.b2ls"
+    converted = convert_json_scene(json_scene, path)
+
+    assert converted.frames.shape[1] == 4  # Highest id is 4: two devices
+    np.testing.assert_array_equal(load_binary_scene(path).frames, converted.frames)
+
+
+def _header(magic=SCENE_MAGIC, version=SCENE_VERSION, channels=5, fixtures=4, steps=3):
+    return SCENE_HEADER.pack(magic, version, channels, fixtures, steps)
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:SCENE_HEADER.size - 1],  # Truncated header
+    lambda data: b"XXXX" + data[4:],
+    lambda data: _header(version=SCENE_VERSION + 1) + data[SCENE_HEADER.size:],
+    lambda data: _header(channels=4) + data[SCENE_HEADER.size:],
+    lambda data: _header(fixtures=3) + data[SCENE_HEADER.size:],
+    lambda data: _header(steps=4) + data[SCENE_HEADER.size:],
+    lambda data: _header(steps=0) + data[SCENE_HEADER.size:],
+    lambda data: data[:-1],  # Truncated frames
+    lambda data: data + b"\0",
+])
+def test_corrupt_file_is_rejected(tmp_path, corrupt):
+    path = tmp_path / "scene.b2ls"
+    CompiledScene.from_steps(STEPS, device_count=2).save(path)
+    path.write_bytes(corrupt(path.read_bytes()))
+
+    with pytest.raises(ValueError):
+        load_binary_scene(path)